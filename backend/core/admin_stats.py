@@ -0,0 +1,133 @@
+# backend/core/admin_stats.py
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List
+from backend.core.storage import storage
+
+# bump to reinstall the triggers and recount
+STATS_SCHEMA = "1"
+
+def _field(row: str, field: str) -> str:
+    return f"COALESCE(json_extract({row}.data, '$.{field}'), '')"
+
+def _day(row: str) -> str:
+    return f"substr({_field(row, 'created_at')}, 1, 10)"
+
+# table -> [(dimension, key expression over a row alias)]
+DIMENSIONS = {
+    "users": [("users", lambda r: "''"), ("role", lambda r: _field(r, "role")), ("signup_day", _day)],
+    "clients": [("clients", lambda r: "''"), ("segmento", lambda r: _field(r, "segmento")), ("client_day", _day)],
+}
+# modules: one count per enabled module key
+MODULE_KEYS = "json_each(COALESCE(json_extract({row}.data, '$.enabled'), '[]'))"
+
+_UPSERT = " ON CONFLICT(dimension, key) DO UPDATE SET count = count + excluded.count"
+
+def _trigger_statements(table: str, row: str, sign: int) -> str:
+    parts = [
+        f"INSERT INTO admin_stats(dimension, key, count) SELECT '{dim}', {expr(row)}, {sign} WHERE true{_UPSERT};"
+        for dim, expr in DIMENSIONS.get(table, [])
+    ]
+    if table == "modules":
+        parts.append(
+            f"INSERT INTO admin_stats(dimension, key, count) SELECT 'module', value, {sign} "
+            f"FROM {MODULE_KEYS.format(row=row)} WHERE true{_UPSERT};"
+        )
+    return " ".join(parts)
+
+class AdminStats:
+    """
+    Materialized counters for the admin home: totals and breakdowns (role,
+    segmento, module adoption, signups per day) kept in `admin_stats` by
+    SQLite triggers on users/clients/modules, so every write path updates
+    them and reading the stats never touches the records themselves.
+    """
+
+    def __init__(self, store=storage):
+        self.store = store
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _conn(self):
+        conn = self.store.connect()
+        if self._ready:
+            return conn
+        with self._lock:
+            if not self._ready and self.store.get_meta("admin_stats") != STATS_SCHEMA:
+                self._install(conn)
+            self._ready = True
+        return conn
+
+    def _install(self, conn):
+        with self.store.transaction():
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS admin_stats ("
+                "dimension TEXT NOT NULL, key TEXT NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (dimension, key)) WITHOUT ROWID"
+            )
+            for table in ("users", "clients", "modules"):
+                for event in ("insert", "update", "delete"):
+                    conn.execute(f"DROP TRIGGER IF EXISTS {table}_stats_{event}")
+                conn.execute(
+                    f"CREATE TRIGGER {table}_stats_insert AFTER INSERT ON {table} BEGIN "
+                    f"{_trigger_statements(table, 'NEW', 1)} END"
+                )
+                conn.execute(
+                    f"CREATE TRIGGER {table}_stats_update AFTER UPDATE OF data ON {table} BEGIN "
+                    f"{_trigger_statements(table, 'OLD', -1)} {_trigger_statements(table, 'NEW', 1)} END"
+                )
+                conn.execute(
+                    f"CREATE TRIGGER {table}_stats_delete AFTER DELETE ON {table} BEGIN "
+                    f"{_trigger_statements(table, 'OLD', -1)} END"
+                )
+            self._recount(conn)
+            self.store.set_meta("admin_stats", STATS_SCHEMA)
+
+    def _recount(self, conn):
+        conn.execute("DELETE FROM admin_stats")
+        for table, dims in DIMENSIONS.items():
+            for dim, expr in dims:
+                conn.execute(
+                    f"INSERT INTO admin_stats(dimension, key, count) "
+                    f"SELECT '{dim}', {expr('r')}, COUNT(*) FROM {table} r GROUP BY 2"
+                )
+        conn.execute(
+            "INSERT INTO admin_stats(dimension, key, count) "
+            f"SELECT 'module', j.value, COUNT(*) FROM modules r, {MODULE_KEYS.format(row='r')} j GROUP BY 2"
+        )
+
+    def ensure(self):
+        """Install the triggers (and count once) if this database doesn't have them yet."""
+        self._conn()
+
+    def rebuild(self):
+        self._conn()
+        with self.store.transaction() as conn:
+            self._recount(conn)
+
+    # ---------------- LEITURA ----------------
+
+    def breakdown(self, dimension: str) -> Dict[str, int]:
+        rows = self._conn().execute(
+            "SELECT key, count FROM admin_stats WHERE dimension = ? AND count > 0 ORDER BY count DESC, key",
+            (dimension,),
+        )
+        return dict(rows.fetchall())
+
+    def total(self, dimension: str) -> int:
+        return self.breakdown(dimension).get("", 0)
+
+    def daily(self, dimension: str, days: int = 30, today: datetime = None) -> List[Dict]:
+        """Zero-filled per-day counts for a *_day dimension, oldest first."""
+        today = (today or datetime.utcnow()).date()
+        first = today - timedelta(days=days - 1)
+        counts = dict(self._conn().execute(
+            "SELECT key, count FROM admin_stats WHERE dimension = ? AND key BETWEEN ? AND ?",
+            (dimension, first.isoformat(), today.isoformat()),
+        ).fetchall())
+        return [
+            {"day": (first + timedelta(days=i)).isoformat(), "count": counts.get((first + timedelta(days=i)).isoformat(), 0)}
+            for i in range(days)
+        ]
+
+admin_stats = AdminStats()
@@ -0,0 +1,76 @@
+# backend/core/assets.py
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict
+
+FRONTEND_DIR = Path(__file__).resolve().parents[2] / "frontend"
+BUILD_DIR = Path(os.getenv("ASSETS_BUILD_DIR", str(FRONTEND_DIR / ".build")))
+MANIFEST_PATH = BUILD_DIR / "manifest.json"
+PAGES_DIR = BUILD_DIR / "pages"
+
+# url prefix -> source directory (relative to frontend/); main.py mounts these
+# and tools/build_assets.py fingerprints them
+STATIC_MOUNTS = {
+    "/landing-static": "landing/static",
+    "/landing-js": "landing/js",
+    "/dashboard-static": "dashboard",
+    "/login-static": "login",
+}
+
+def mount_build_dir(prefix: str) -> Path:
+    return BUILD_DIR / prefix.strip("/")
+
+class AssetManifest:
+    """
+    Maps public asset URLs to their fingerprinted copies, as written by
+    `python -m backend.tools.build_assets`. Reloaded whenever manifest.json
+    changes; without a build every URL resolves to itself.
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH, pages_dir: Path = PAGES_DIR):
+        self.path = path
+        self.pages_dir = pages_dir
+        self._lock = threading.Lock()
+        self._signature = None
+        self._urls: Dict[str, str] = {}
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self):
+        if self._stat_signature() == self._signature:
+            return
+        with self._lock:
+            signature = self._stat_signature()
+            if signature == self._signature:
+                return
+            try:
+                self._urls = json.loads(self.path.read_text("utf-8")).get("assets", {})
+            except (OSError, ValueError):
+                self._urls = {}
+            self._signature = signature
+
+    def signature(self):
+        """Changes whenever a new build is published (None without a build)."""
+        self.refresh()
+        return self._signature
+
+    def url(self, path: str) -> str:
+        self.refresh()
+        return self._urls.get(path, path)
+
+    def page(self, rel: str) -> Path:
+        """An HTML page under frontend/, with asset URLs rewritten when a build exists."""
+        built = self.pages_dir / rel
+        return built if built.is_file() else FRONTEND_DIR / rel
+
+assets = AssetManifest()
+
+def asset_url(path: str) -> str:
+    return assets.url(path)
@@ -0,0 +1,47 @@
+# backend/core/body_limit.py
+from typing import Dict
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class BodySizeLimit:
+    """
+    ASGI middleware capping the request body of selected paths, before any
+    route (or the multipart parser behind UploadFile) reads it: a declared
+    Content-Length over the limit is answered 413 right away, and a body that
+    keeps coming past it (chunked, or a lying header) is cut off with a 413.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    @staticmethod
+    def _detail(limit: int) -> str:
+        return f"Arquivo muito grande (máximo de {limit} bytes)"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        declared = Headers(scope=scope).get("content-length", "")
+        if declared.isdigit() and int(declared) > limit:
+            await JSONResponse({"detail": self._detail(limit)}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # raised inside the body parse: the app's exception handling answers it
+                    raise HTTPException(413, self._detail(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
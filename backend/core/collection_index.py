@@ -0,0 +1,207 @@
+# backend/core/collection_index.py
+import base64
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+MAX_PAGE_SIZE = 500
+
+class InvalidCursor(ValueError):
+    pass
+
+def _sort_key(value) -> Tuple[bool, str]:
+    # missing values sort last (ascending); everything compares as folded text
+    return (value is None or value == "", str(value if value is not None else "").casefold())
+
+def encode_cursor(sort: str, key: Tuple[bool, str], record_id: str) -> str:
+    raw = json.dumps([sort, key[0], key[1], record_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Tuple[bool, str], str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        field, missing, text, record_id = json.loads(raw)
+    except Exception:
+        raise InvalidCursor("cursor inválido")
+    if field != sort:
+        raise InvalidCursor("cursor gerado para outra ordenação")
+    return (bool(missing), str(text)), str(record_id)
+
+class CollectionIndex:
+    """
+    Read-side view of one storage collection for list endpoints: records are
+    kept in memory together with one precomputed ordering per sortable field,
+    and rebuilt only when the collection version changes.
+
+    Pages are addressed by an opaque cursor (sort key + id of the last item),
+    found by binary search in the ordering, so page N costs the same as page 1
+    and results stay stable while records are added.
+
+    Equality filters on `filter_fields` walk a per-value ordering (only the
+    matching records), and a created_at range is a bisected slice when
+    sorting by created_at, so sparse filters don't scan the collection.
+    """
+
+    def __init__(
+        self,
+        repository,
+        sort_fields: Sequence[str],
+        hidden: Sequence[str] = (),
+        default_sort: str = "created_at",
+        filter_fields: Sequence[str] = (),
+    ):
+        self.repository = repository
+        self.sort_fields = tuple(sort_fields)
+        self.filter_fields = tuple(filter_fields)
+        self.hidden = frozenset(hidden)
+        self.default_sort = default_sort
+        self._lock = threading.Lock()
+        self._version = None
+        # field -> (sorted [(key, id)], records in the same order)
+        self._orders: Dict[str, Tuple[List[Tuple], List[Dict]]] = {}
+        # (filter field, folded value) -> sort field -> ordering of the matching records
+        self._by_value: Dict[Tuple[str, str], Dict[str, Tuple[List[Tuple], List[Dict]]]] = {}
+
+    @staticmethod
+    def _fold(value) -> str:
+        return str(value or "").casefold()
+
+    def _refresh(self):
+        if self.repository.version() == self._version:
+            return
+        with self._lock:
+            version = self.repository.version()
+            if version == self._version:
+                return
+            records = [
+                {k: v for k, v in r.items() if k not in self.hidden}
+                for r in self.repository.all()
+            ]
+            orders, by_value = {}, {}
+            for field in self.sort_fields:
+                ranked = sorted(records, key=lambda r: (_sort_key(r.get(field)), r.get("id") or ""))
+                keys = [(_sort_key(r.get(field)), r.get("id") or "") for r in ranked]
+                orders[field] = (keys, ranked)
+                for filter_field in self.filter_fields:
+                    for key, record in zip(keys, ranked):
+                        sub = by_value.setdefault((filter_field, self._fold(record.get(filter_field))), {})
+                        sub_keys, sub_records = sub.setdefault(field, ([], []))
+                        sub_keys.append(key)
+                        sub_records.append(record)
+            self._orders, self._by_value = orders, by_value
+            self._version = version
+
+    @staticmethod
+    def _matches(record: Dict, filters: Dict[str, str], created_from: Optional[str], created_to: Optional[str]) -> bool:
+        for field, wanted in filters.items():
+            if str(record.get(field) or "").casefold() != wanted.casefold():
+                return False
+        if created_from or created_to:
+            created = record.get("created_at") or ""
+            if not created:
+                return False
+            # ISO strings compare in time order; a bare date as upper bound covers the whole day
+            if created_from and created < created_from:
+                return False
+            if created_to and created[:len(created_to)] > created_to:
+                return False
+        return True
+
+    @staticmethod
+    def _created_bounds(keys: List[Tuple], created_from: Optional[str], created_to: Optional[str]) -> Tuple[int, int]:
+        """Slice [lo, hi) of a created_at ordering inside the range (records without a date excluded)."""
+        lo = bisect_left(keys, ((False, created_from.casefold()), "")) if created_from else 0
+        # same "whole day" rule as _matches: anything that starts with created_to is still inside
+        upper = ((False, created_to.casefold() + "\U0010ffff"), "") if created_to else ((True, ""), "")
+        return lo, max(lo, bisect_left(keys, upper))
+
+    @staticmethod
+    def _walk(
+        keys: List[Tuple], records: List[Dict], descending: bool, after: Optional[Tuple], bounds: Optional[Tuple[int, int]] = None,
+    ) -> Iterator[Dict]:
+        if bounds is not None:
+            # a created_at range: one contiguous slice, no missing values in it
+            lo, hi = bounds
+            if not descending:
+                start = max(lo, bisect_right(keys, after)) if after else lo
+                return (records[i] for i in range(start, hi))
+            end = min(hi, bisect_left(keys, after)) if after else hi
+            return (records[i] for i in range(end - 1, lo - 1, -1))
+        if not descending:
+            start = bisect_right(keys, after) if after else 0
+            return (records[i] for i in range(start, len(keys)))
+        # descending still lists records without a value last: [present, reversed] + [missing, reversed]
+        first_missing = bisect_left(keys, ((True, ""), ""))
+        missing = range(len(keys) - 1, first_missing - 1, -1)
+        if after is None:
+            positions = chain(range(first_missing - 1, -1, -1), missing)
+        elif after[0][0]:
+            positions = range(bisect_left(keys, after) - 1, first_missing - 1, -1)
+        else:
+            positions = chain(range(bisect_left(keys, after) - 1, -1, -1), missing)
+        return (records[i] for i in positions)
+
+    def page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        sort: Optional[str] = None,
+        filters: Optional[Dict[str, str]] = None,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict:
+        """
+        `sort` is a field name, prefixed with "-" for descending. `filters`
+        are case-insensitive equality matches; `fields` projects each item.
+        Raises InvalidCursor / ValueError for bad arguments.
+        """
+        sort = sort or self.default_sort
+        descending = sort.startswith("-")
+        field = sort.lstrip("-")
+        if field not in self.sort_fields:
+            raise ValueError(f"ordenação inválida: use um de {', '.join(self.sort_fields)}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        filters = {k: v for k, v in (filters or {}).items() if v}
+        after = decode_cursor(cursor, field) if cursor else None
+        self._refresh()
+
+        # narrowest ordering available: one indexed filter value, then a created_at slice
+        keys, records = self._orders[field]
+        indexed = next((f for f in self.filter_fields if f in filters), None)
+        if indexed:
+            keys, records = self._by_value.get((indexed, self._fold(filters.pop(indexed))), {}).get(field, ([], []))
+        bounds = None
+        if field == "created_at" and (created_from or created_to):
+            bounds = self._created_bounds(keys, created_from, created_to)
+            created_from = created_to = None
+
+        items, has_more = [], False
+        for record in self._walk(keys, records, descending, after, bounds):
+            # only what the index couldn't narrow down is checked per record
+            if (filters or created_from or created_to) and not self._matches(record, filters, created_from, created_to):
+                continue
+            if len(items) == limit:
+                has_more = True
+                break
+            items.append(record)
+
+        next_cursor = None
+        if has_more:
+            last = items[-1]
+            next_cursor = encode_cursor(field, _sort_key(last.get(field)), last.get("id") or "")
+        if fields:
+            items = [{f: r.get(f) for f in fields if f not in self.hidden} for r in items]
+        else:
+            items = [dict(r) for r in items]
+        return {"items": items, "next_cursor": next_cursor, "sort": sort, "limit": limit}
+
+    def total(self) -> int:
+        self._refresh()
+        return len(next(iter(self._orders.values()), ([], []))[0])
+
+def list_page(index_page: Callable[..., Dict], fields: Optional[str] = None, **query) -> Dict:
+    """For list routes: `fields` as "a,b,c". Bad sort/cursor arguments raise ValueError (answer 400)."""
+    return index_page(fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None, **query)
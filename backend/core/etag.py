@@ -0,0 +1,25 @@
+# backend/core/etag.py
+import hashlib
+from typing import Any
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+# clients must revalidate, but a matching ETag costs a 304 with no body
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from whatever identifies a representation (route, ids, version counters)."""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in header.split(",")]
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def json_with_etag(content: Any, etag: str) -> JSONResponse:
+    return JSONResponse(content=content, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
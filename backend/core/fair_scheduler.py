@@ -0,0 +1,163 @@
+# backend/core/fair_scheduler.py
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Dict, Optional
+
+class SchedulerBusy(Exception):
+    """Raised instead of queueing when the budget is exhausted (maps to HTTP 429)."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class Ticket:
+    __slots__ = ("tenant", "finish_tag", "seq", "future", "enqueued_at", "started_at", "cancelled", "released")
+
+    def __init__(self, tenant: str, finish_tag: float, seq: int, future: Optional[asyncio.Future]):
+        self.tenant = tenant
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.cancelled = False
+        self.released = False
+
+    def __lt__(self, other: "Ticket"):
+        return (self.finish_tag, self.seq) < (other.finish_tag, other.seq)
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.started_at or time.monotonic()) - self.enqueued_at
+
+class FairScheduler:
+    """
+    Caps in-flight calls to a shared backend and orders waiting calls with
+    weighted fair queueing: every request gets a virtual finish tag
+    max(now_vtime, tenant_last_tag) + 1/weight and the smallest tag runs next,
+    so a tenant with weight 2 gets twice the share of one with weight 1 and a
+    burst from one tenant cannot starve the others.
+
+    Each tenant's queue is bounded, and so is the total; beyond that acquire()
+    fails fast with SchedulerBusy and a Retry-After estimate.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = 4,
+        max_queue_per_tenant: int = 10,
+        max_queue_total: int = 100,
+        weights: Optional[Dict[str, float]] = None,
+        default_weight: float = 1.0,
+        queue_timeout: float = 30.0,
+    ):
+        self.max_inflight = max_inflight
+        self.max_queue_per_tenant = max_queue_per_tenant
+        self.max_queue_total = max_queue_total
+        self.weights = weights or {}
+        self.default_weight = default_weight
+        self.queue_timeout = queue_timeout
+        self._inflight = 0
+        self._heap = []
+        self._queued: Dict[str, int] = {}
+        self._last_tag: Dict[str, float] = {}
+        self._vtime = 0.0
+        self._seq = itertools.count()
+        # EWMA of model time per call, used for Retry-After
+        self._avg_service = 2.0
+        self.stats_counters = {"admitted": 0, "rejected": 0, "timed_out": 0}
+        self._wait_total = 0.0
+        self._service_total = 0.0
+        self._completed = 0
+
+    # ---------------- FILA ----------------
+
+    def _weight(self, tenant: str) -> float:
+        return max(self.weights.get(tenant, self.default_weight), 0.01)
+
+    def _queued_total(self) -> int:
+        return sum(self._queued.values())
+
+    def _retry_after(self) -> float:
+        waves = (self._queued_total() + self._inflight) / max(self.max_inflight, 1)
+        return max(1.0, math.ceil(waves * self._avg_service))
+
+    def _dispatch(self):
+        while self._heap and self._inflight < self.max_inflight:
+            ticket = heapq.heappop(self._heap)
+            if ticket.cancelled:
+                continue
+            self._queued[ticket.tenant] -= 1
+            self._vtime = ticket.finish_tag
+            self._inflight += 1
+            ticket.started_at = time.monotonic()
+            ticket.future.set_result(True)
+
+    async def acquire(self, tenant: str) -> Ticket:
+        tag = max(self._vtime, self._last_tag.get(tenant, 0.0)) + 1.0 / self._weight(tenant)
+
+        if self._inflight < self.max_inflight and not self._heap:
+            self._last_tag[tenant] = tag
+            self._vtime = tag
+            self._inflight += 1
+            ticket = Ticket(tenant, tag, next(self._seq), None)
+            ticket.started_at = ticket.enqueued_at
+            self.stats_counters["admitted"] += 1
+            return ticket
+
+        if self._queued.get(tenant, 0) >= self.max_queue_per_tenant:
+            self.stats_counters["rejected"] += 1
+            raise SchedulerBusy("fila do tenant cheia", self._retry_after())
+        if self._queued_total() >= self.max_queue_total:
+            self.stats_counters["rejected"] += 1
+            raise SchedulerBusy("fila global cheia", self._retry_after())
+
+        self._last_tag[tenant] = tag
+        ticket = Ticket(tenant, tag, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, ticket)
+        self._queued[tenant] = self._queued.get(tenant, 0) + 1
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if ticket.future.done():
+                # got the slot at the same moment we gave up: hand it back
+                self.release(ticket)
+            else:
+                ticket.cancelled = True
+                self._queued[tenant] -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats_counters["timed_out"] += 1
+                raise SchedulerBusy("tempo de fila excedido", self._retry_after())
+            raise
+        self.stats_counters["admitted"] += 1
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """Free the slot; safe to call more than once for the same ticket."""
+        if ticket.released:
+            return
+        ticket.released = True
+        self._inflight -= 1
+        if ticket.started_at is not None:
+            service = time.monotonic() - ticket.started_at
+            self._avg_service = 0.8 * self._avg_service + 0.2 * service
+            self._wait_total += ticket.queue_wait
+            self._service_total += service
+            self._completed += 1
+        self._dispatch()
+
+    # ---------------- MÉTRICAS ----------------
+
+    def stats(self) -> Dict:
+        done = self._completed or 1
+        return {
+            **self.stats_counters,
+            "inflight": self._inflight,
+            "queued": dict((t, n) for t, n in self._queued.items() if n),
+            "avg_queue_wait_ms": round(self._wait_total / done * 1000, 1),
+            "avg_model_time_ms": round(self._service_total / done * 1000, 1),
+        }
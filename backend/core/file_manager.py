@@ -1,31 +1,132 @@
 # backend/core/file_manager.py
+import hashlib
 import os
+import re
+import tempfile
+from datetime import datetime
 from pathlib import Path
 from werkzeug.utils import secure_filename  # for filename sanitization
-from typing import Tuple
+from typing import BinaryIO, Dict, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from backend.core.storage import storage
 
 BASE_UPLOADS = Path(__file__).resolve().parents[1].parent / "frontend" / "dashboard" / "assets" / "user_uploads"
+UPLOADS_URL = "/uploads"  # where main.py mounts BASE_UPLOADS
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "svg"}
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+# multipart boundaries and part headers around the file, allowed on top of UPLOAD_MAX_BYTES
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+BLOBS_DIR = BASE_UPLOADS / "blobs"
+TMP_DIR = BASE_UPLOADS / "tmp"
+BLOB_RE = re.compile(r"^[0-9a-f]{64}\.[a-z]+$")
+# resized copies (services/image_service.py): <sha256>.w<width>.<webp|png|jpg>,
+# shared by every extension the same content was uploaded under
+VARIANT_RE = re.compile(r"^[0-9a-f]{64}\.w\d+\.(webp|png|jpg)$")
+
+class UploadTooLarge(Exception):
+    pass
 
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def save_upload(file, client_id: str) -> Tuple[bool, str]:
+# ---------------- BLOBS ----------------
+# files are stored once by content: blobs/<2 hex>/<sha256>.<ext>; the uploads
+# collection keeps one reference per (owner, blob)
+
+def blob_path(blob: str) -> Path:
+    return BLOBS_DIR / blob[:2] / blob
+
+def blob_url(blob: str) -> str:
+    return f"{UPLOADS_URL}/blobs/{blob[:2]}/{blob}"
+
+def is_blob(name: str) -> bool:
+    return bool(BLOB_RE.match(name or ""))
+
+def blob_from_url(url: Optional[str]) -> Optional[str]:
+    prefix = f"{UPLOADS_URL}/blobs/"
+    blob = url.rsplit("/", 1)[1] if url and url.startswith(prefix) else None
+    return blob if blob and is_blob(blob) else None
+
+def _spool(src: BinaryIO, ext: str, max_bytes: int) -> Tuple[Path, str, int]:
+    """Copy `src` to a temp file chunk by chunk, hashing as it goes; (temp path, sha256, size)."""
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=TMP_DIR, suffix=f".{ext}")
+    sha, size = hashlib.sha256(), 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"arquivo maior que {max_bytes} bytes")
+                sha.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return Path(tmp), sha.hexdigest(), size
+
+def _store(src: BinaryIO, owner: str, filename: str, max_bytes: int) -> Dict:
+    ext = filename.rsplit(".", 1)[1].lower()
+    tmp, digest, size = _spool(src, ext, max_bytes)
+    blob = f"{digest}.{ext}"
+    dest = blob_path(blob)
+    try:
+        # same write lock as release_upload(), so a blob can't be removed
+        # between "already there" and the new reference being recorded
+        with storage.transaction():
+            if not dest.exists():
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, dest)
+            ref = {
+                "id": f"{owner}:{blob}",
+                "owner": owner,
+                "blob": blob,
+                "filename": filename,
+                "size": size,
+                "created_at": datetime.utcnow().isoformat(),
+            }
+            storage.uploads.upsert(ref)
+    finally:
+        # still there when the blob already existed (or on error)
+        tmp.unlink(missing_ok=True)
+    return ref
+
+async def save_upload(file, client_id: str, max_bytes: int = UPLOAD_MAX_BYTES) -> Tuple[bool, str]:
     """
     file is a Starlette UploadFile
-    returns (success, relative_path)
+    returns (success, url); raises UploadTooLarge past `max_bytes`
     """
     if not file:
         return False, ""
-    filename = secure_filename(file.filename)
+    filename = secure_filename(file.filename or "")
     if not allowed_file(filename):
         return False, "file-type-not-allowed"
-    upload_dir = BASE_UPLOADS / client_id
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    dest = upload_dir / filename
-    with open(dest, "wb") as f:
-        content = file.file.read()
-        f.write(content)
-    # relative path for serving (adjust to your static route)
-    rel = f"/static/uploads/{client_id}/{filename}"
-    return True, rel
+    # the copy and hashing run in a worker thread, never on the event loop
+    ref = await run_in_threadpool(_store, file.file, client_id, filename, max_bytes)
+    return True, blob_url(ref["blob"])
+
+def release_upload(client_id: str, url: Optional[str]) -> bool:
+    """Drop `client_id`'s reference to an uploaded file; the blob goes when nobody references it."""
+    blob = blob_from_url(url)
+    if not blob:
+        return False
+    digest = blob.split(".", 1)[0]
+    with storage.transaction():
+        if not storage.uploads.delete(f"{client_id}:{blob}"):
+            return False
+        if storage.uploads.find_one("blob", blob):
+            return True
+        blob_path(blob).unlink(missing_ok=True)
+        # variants only go with the last blob of this content (x.jpg and x.jpeg share them)
+        if not any(storage.uploads.find_one("blob", f"{digest}.{ext}") for ext in ALLOWED_EXTENSIONS):
+            for path in blob_path(blob).parent.glob(f"{digest}.w*"):
+                if VARIANT_RE.match(path.name):
+                    path.unlink(missing_ok=True)
+    return True
@@ -0,0 +1,133 @@
+# backend/core/hashing.py
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Union
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_MAX_CONCURRENCY = int(os.getenv("HASH_MAX_CONCURRENCY", str(max(1, (os.cpu_count() or 2) // 2))))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "32"))
+# bulk imports: processes used to hash a whole batch
+BULK_HASH_WORKERS = int(os.getenv("BULK_HASH_WORKERS", str(os.cpu_count() or 2)))
+# bcrypt only reads this many bytes; bcrypt >= 5 raises ValueError past it
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+def _bcrypt_hash(password: str, rounds: int) -> str:
+    # module level so it can be pickled into the process pool
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+
+class HasherBusy(Exception):
+    """Too many hashes pending; callers should answer 503 instead of queueing more CPU work."""
+
+    retry_after = 1
+
+class PasswordTooLong(ValueError):
+    """Password past BCRYPT_MAX_PASSWORD_BYTES; callers should answer 400 instead of hashing a prefix."""
+
+class PasswordHasher:
+    """
+    bcrypt off the event loop: hashes run in a bounded thread pool (bcrypt
+    releases the GIL), at most `max_concurrency` at a time with up to
+    `max_queue` waiting. Beyond that HasherBusy is raised immediately.
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, max_concurrency: int = HASH_MAX_CONCURRENCY, max_queue: int = HASH_MAX_QUEUE):
+        self.rounds = rounds
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._bulk_pool: Optional[ProcessPoolExecutor] = None
+
+    # ---------------- PRIMITIVAS ----------------
+
+    def _hash(self, password: str) -> str:
+        return _bcrypt_hash(password, self.rounds)
+
+    @staticmethod
+    def _verify(password: str, hashed: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode(), (hashed or "").encode())
+        except Exception:
+            return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True when the stored hash was made with a different cost factor."""
+        try:
+            return int((hashed or "").split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    # ---------------- ADMISSÃO ----------------
+
+    @staticmethod
+    def _check_length(password: str):
+        if len(password.encode()) > BCRYPT_MAX_PASSWORD_BYTES:
+            raise PasswordTooLong(f"a senha deve ter no máximo {BCRYPT_MAX_PASSWORD_BYTES} bytes")
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_concurrency + self.max_queue:
+                raise HasherBusy("fila de hashing cheia")
+            self._pending += 1
+
+    def _done(self, _=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn, *args):
+        self._admit()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._done()
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    # ---------------- API ----------------
+
+    async def hash(self, password: str) -> str:
+        self._check_length(password)
+        return await asyncio.wrap_future(self._submit(self._hash, password))
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await asyncio.wrap_future(self._submit(self._verify, password, hashed))
+
+    def hash_blocking(self, password: str) -> str:
+        """For sync code paths (already running in a worker thread)."""
+        self._check_length(password)
+        return self._submit(self._hash, password).result()
+
+    def verify_blocking(self, password: str, hashed: str) -> bool:
+        return self._submit(self._verify, password, hashed).result()
+
+    async def hash_many(self, passwords: List[str]) -> List[Union[str, Exception]]:
+        """
+        Hash a whole batch (bulk import) across a process pool, in input order.
+        Kept apart from the login executor so an import can't starve sign-ins.
+        A password that can't be hashed gets its exception in its slot instead
+        of failing the batch.
+        """
+        if not passwords:
+            return []
+        with self._lock:
+            if self._bulk_pool is None:
+                self._bulk_pool = ProcessPoolExecutor(max_workers=BULK_HASH_WORKERS)
+        futures = [asyncio.wrap_future(self._bulk_pool.submit(_bcrypt_hash, p, self.rounds)) for p in passwords]
+        return list(await asyncio.gather(*futures, return_exceptions=True))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._bulk_pool is not None:
+            self._bulk_pool.shutdown(wait=False, cancel_futures=True)
+            self._bulk_pool = None
+
+    def stats(self) -> dict:
+        return {"pending": self._pending, "max_concurrency": self.max_concurrency, "max_queue": self.max_queue, "rounds": self.rounds}
+
+hasher = PasswordHasher()
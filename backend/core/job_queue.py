@@ -0,0 +1,214 @@
+# backend/core/job_queue.py
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+from backend.core.storage import storage
+
+logger = logging.getLogger("ghostai")
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+class JobQueue:
+    """
+    Durable job queue stored in the SQLite database.
+
+    Jobs move queued -> running -> done, or back to queued with exponential
+    backoff when the handler raises. After `max_attempts` failures a job goes
+    to the dead-letter list (status "dead") until someone retries it.
+    A claimed job holds a lease: if its process dies mid-job, another worker
+    picks it up again once the lease expires.
+    """
+
+    def __init__(
+        self,
+        store=storage,
+        workers: int = JOB_WORKERS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        backoff_base: float = 2.0,
+        backoff_max: float = 600.0,
+        poll_interval: float = 1.0,
+        lease: float = JOB_LEASE_SECONDS,
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._handlers: Dict[str, Callable[[Dict], None]] = {}
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._schema_ready = False
+
+    # ---------------- SCHEMA ----------------
+
+    def _conn(self):
+        conn = self.store.connect()
+        if not self._schema_ready:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    run_at REAL NOT NULL,
+                    last_error TEXT,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready_idx ON jobs(status, run_at)")
+            self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _row_to_job(row) -> Dict:
+        keys = ("id", "kind", "payload", "status", "attempts", "run_at", "last_error", "result", "created_at", "updated_at")
+        job = dict(zip(keys, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    # ---------------- API ----------------
+
+    def handler(self, kind: str):
+        def register(fn: Callable[[Dict], None]):
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def enqueue(self, kind: str, payload: Dict, delay: float = 0.0) -> str:
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        self._conn()
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs(id, kind, payload, status, attempts, run_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', 0, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload, ensure_ascii=False), now + delay, now, now),
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        rows = self._conn().execute(
+            "SELECT * FROM jobs WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?", (limit,)
+        )
+        return [self._row_to_job(r) for r in rows]
+
+    def retry(self, job_id: str) -> bool:
+        """Move a dead job back to the queue with a fresh attempt budget."""
+        self._conn()
+        with self.store.transaction() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'dead'",
+                (time.time(), time.time(), job_id),
+            )
+        self._wakeup.set()
+        return cur.rowcount > 0
+
+    # ---------------- WORKERS ----------------
+
+    def _claim(self) -> Optional[Dict]:
+        now = time.time()
+        self._conn()
+        with self.store.transaction() as conn:
+            # for running jobs run_at is the lease expiry
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') AND run_at <= ? "
+                "ORDER BY run_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, run_at = ?, updated_at = ? "
+                "WHERE id = ?",
+                (now + self.lease, now, row[0]),
+            )
+        job = self._row_to_job(row)
+        job["attempts"] += 1
+        return job
+
+    def _finish(self, job: Dict, result=None):
+        with self.store.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False) if result is not None else None, time.time(), job["id"]),
+            )
+
+    def _fail(self, job: Dict, error: str):
+        now = time.time()
+        if job["attempts"] >= self.max_attempts:
+            status, run_at = "dead", now
+            logger.error("Job %s (%s) movido para dead-letter: %s", job["id"], job["kind"], error)
+        else:
+            delay = min(self.backoff_max, self.backoff_base ** job["attempts"])
+            status, run_at = "queued", now + delay * random.uniform(0.8, 1.2)
+            logger.warning("Job %s (%s) falhou (tentativa %s): %s", job["id"], job["kind"], job["attempts"], error)
+        with self.store.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, run_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (status, run_at, error, now, job["id"]),
+            )
+
+    def run_once(self) -> bool:
+        """Claim and run a single ready job. Returns False when nothing was ready."""
+        job = self._claim()
+        if not job:
+            return False
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            self._fail(job, f"sem handler para '{job['kind']}'")
+            return True
+        try:
+            result = handler(job["payload"])
+        except Exception as e:
+            self._fail(job, f"{type(e).__name__}: {e}")
+        else:
+            self._finish(job, result)
+        return True
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Erro no worker da fila de jobs")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+job_queue = JobQueue()
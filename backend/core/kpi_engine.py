@@ -0,0 +1,157 @@
+# backend/core/kpi_engine.py
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from backend.core.storage import storage
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+# bucket size -> how many buckets are kept
+# (hours cover 8 days so the 7-day dashboard window is exact to the hour)
+RETENTION = {MINUTE: 180, HOUR: 192, DAY: 400}
+ALL_TENANTS = "*"
+
+class KpiEngine:
+    """
+    Per-tenant event counters in fixed minute/hour/day buckets, stored in the
+    SQLite database so every worker process sees the same numbers.
+
+    Writes add to one bucket per resolution; a rolling window is answered by
+    covering it with whole days in the middle, hours and minutes at the edges,
+    so a query reads O(buckets) rows whatever the event volume. Windows that
+    reach past the minute (or hour) retention are aligned down to the hour
+    (or day) at their start.
+    Every event is also counted under ALL_TENANTS.
+    """
+
+    def __init__(self, store=storage, prune_interval: float = 600.0):
+        self.store = store
+        self.prune_interval = prune_interval
+        self._schema_ready = False
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+
+    # ---------------- SCHEMA ----------------
+
+    def _conn(self):
+        conn = self.store.connect()
+        if not self._schema_ready:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS kpi_buckets (
+                    tenant TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    resolution INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (tenant, metric, resolution, bucket)
+                ) WITHOUT ROWID"""
+            )
+            self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _version_key(tenant: str) -> str:
+        return f"kpi:{tenant}"
+
+    # ---------------- ESCRITA ----------------
+
+    def record(self, tenant: Optional[str], metric: str, ts: Optional[float] = None, n: int = 1):
+        self.record_many([(tenant, metric, ts if ts is not None else time.time(), n)])
+
+    def record_many(self, events: Iterable[Tuple[Optional[str], str, float, int]]):
+        rows: Dict[Tuple, int] = {}
+        tenants = set()
+        for tenant, metric, ts, n in events:
+            for t in {tenant or ALL_TENANTS, ALL_TENANTS}:
+                tenants.add(t)
+                for step in RETENTION:
+                    key = (t, metric, step, int(ts // step))
+                    rows[key] = rows.get(key, 0) + n
+        if not rows:
+            return
+        self._conn()
+        with self.store.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO kpi_buckets(tenant, metric, resolution, bucket, count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(tenant, metric, resolution, bucket) DO UPDATE SET count = count + excluded.count",
+                [(*key, n) for key, n in rows.items()],
+            )
+            conn.executemany(
+                "INSERT INTO collection_versions(name, version) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                [(self._version_key(t),) for t in tenants],
+            )
+        self._maybe_prune()
+
+    def _maybe_prune(self):
+        now = time.time()
+        with self._lock:
+            if now - self._pruned_at < self.prune_interval:
+                return
+            self._pruned_at = now
+        with self.store.transaction() as conn:
+            for step, keep in RETENTION.items():
+                conn.execute(
+                    "DELETE FROM kpi_buckets WHERE resolution = ? AND bucket < ?",
+                    (step, int(now // step) - keep),
+                )
+
+    def reset(self, metrics: Iterable[str]):
+        """Drop every bucket of `metrics` (before a rebuild)."""
+        self._conn()
+        with self.store.transaction() as conn:
+            conn.executemany("DELETE FROM kpi_buckets WHERE metric = ?", [(m,) for m in metrics])
+
+    # ---------------- LEITURA ----------------
+
+    def version(self, tenant: Optional[str]) -> int:
+        row = self._conn().execute(
+            "SELECT version FROM collection_versions WHERE name = ?", (self._version_key(tenant or ALL_TENANTS),)
+        ).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _segments(start: float, end: float) -> List[Tuple[int, int, int]]:
+        """Cover [start, end] with the fewest buckets: [(resolution, first bucket, last bucket), ...]."""
+        s = int(start) // MINUTE * MINUTE
+        e = (int(end) // MINUTE + 1) * MINUTE
+        if s < e - MINUTE * RETENTION[MINUTE]:
+            s = s // HOUR * HOUR
+        if s < e - HOUR * RETENTION[HOUR]:
+            s = s // DAY * DAY
+        segments: List[List[int]] = []
+        t = s
+        while t < e:
+            step = next(st for st in (DAY, HOUR, MINUTE) if t % st == 0 and t + st <= e)
+            bucket = t // step
+            if segments and segments[-1][0] == step and segments[-1][2] == bucket - 1:
+                segments[-1][2] = bucket
+            else:
+                segments.append([step, bucket, bucket])
+            t += step
+        return [tuple(seg) for seg in segments]
+
+    def window(self, tenant: Optional[str], metric: str, seconds: float, now: Optional[float] = None) -> int:
+        """Events of `metric` in the last `seconds` (current minute included)."""
+        now = time.time() if now is None else now
+        segments = self._segments(now - seconds, now)
+        clause = " OR ".join("(resolution = ? AND bucket BETWEEN ? AND ?)" for _ in segments)
+        params = [p for seg in segments for p in seg]
+        row = self._conn().execute(
+            f"SELECT COALESCE(SUM(count), 0) FROM kpi_buckets WHERE tenant = ? AND metric = ? AND ({clause})",
+            (tenant or ALL_TENANTS, metric, *params),
+        ).fetchone()
+        return row[0]
+
+    def series(self, tenant: Optional[str], metric: str, resolution: int = DAY, points: int = 30, now: Optional[float] = None) -> List[Dict]:
+        """Last `points` buckets of one resolution, oldest first, zero-filled."""
+        now = time.time() if now is None else now
+        last = int(now // resolution)
+        first = last - points + 1
+        counts = dict(self._conn().execute(
+            "SELECT bucket, count FROM kpi_buckets WHERE tenant = ? AND metric = ? AND resolution = ? "
+            "AND bucket BETWEEN ? AND ?",
+            (tenant or ALL_TENANTS, metric, resolution, first, last),
+        ).fetchall())
+        return [{"ts": b * resolution, "count": counts.get(b, 0)} for b in range(first, last + 1)]
+
+kpis = KpiEngine()
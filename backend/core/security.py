@@ -1,35 +1,76 @@
 # backend/core/security.py
+import hashlib
 import os
+import time
+import uuid
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from dotenv import load_dotenv
+from backend.core.hashing import hasher
+from backend.core.lru_cache import LRUCache
+from backend.core.token_store import revocations
 
-load_dotenv()
+# carregar .env
+ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
+load_dotenv(dotenv_path=ENV_PATH)
 
-SECRET_KEY = os.getenv("SECRET_KEY", "change-me-to-a-strong-secret")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+# single source for JWT settings: routes, main and security_user all come through here
+SECRET_KEY = os.getenv("SECRET_KEY", "change_this_secret")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+# short-lived on purpose: sessions are kept alive with refresh tokens (core/token_store.py)
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# verified claims keyed by token digest, each kept until the token's own exp
+_verified = LRUCache(max_entries=AUTH_CACHE_MAX_ENTRIES, max_bytes=AUTH_CACHE_MAX_ENTRIES * 1024)
 
 def hash_password(plain_password: str) -> str:
-    return pwd_context.hash(plain_password)
+    return hasher.hash_blocking(plain_password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return hasher.verify_blocking(plain_password, hashed_password)
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    # jti lets a single token be revoked (logout) without touching the others
+    to_encode.update({"exp": expire, "iat": now, "jti": uuid.uuid4().hex})
     token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
 def decode_access_token(token: str) -> dict:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        raise
+    """
+    Verified claims for `token`. The HMAC check and JSON parse only happen the
+    first time a token is seen; after that the claims come from the cache until
+    the token expires. Revocation is checked on every call. Raises JWTError.
+    """
+    key = token_digest(token)
+    claims = _verified.get(key)
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        remaining = float(claims.get("exp", 0)) - time.time()
+        if remaining > 0:
+            _verified.set(key, claims, ttl=remaining, size=len(token) + 512)
+    elif float(claims.get("exp", 0)) <= time.time():
+        _verified.pop(key)
+        raise JWTError("Signature has expired.")
+    # tokens issued before jti existed are revoked by digest
+    if revocations.is_revoked(claims.get("jti") or key):
+        raise JWTError("Token revogado")
+    return dict(claims)
+
+def revoke_token(token: str, claims: Optional[dict] = None):
+    """Revoke `token` until its exp; `claims` may be passed if already decoded."""
+    claims = claims or decode_access_token(token)
+    key = token_digest(token)
+    revocations.revoke(claims.get("jti") or key, claims.get("exp", time.time()))
+    _verified.pop(key)
+
+def auth_cache_stats() -> dict:
+    return {**_verified.stats(), "revoked": len(revocations)}
@@ -1,53 +1,51 @@
 # backend/core/security_user.py
-from fastapi import HTTPException, Depends
+from typing import Optional
+from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
-import os
-from pathlib import Path
-import json
-from dotenv import load_dotenv
+from jose import JWTError
+from backend.core.storage import storage
+from backend.core.user_repository import user_repo
+from backend.core.security import decode_access_token
 
-# carregar .env
-ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
-load_dotenv(dotenv_path=ENV_PATH)
-
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-
-DATA_FILE = Path(__file__).resolve().parents[2] / "data" / "users.json"
-
-security = HTTPBearer()
+# auto_error=False: the cookie is accepted when there is no Authorization header
+security = HTTPBearer(auto_error=False)
 
 # ---------------- UTILIDADES ----------------
 
 def read_users():
-    if not DATA_FILE.exists():
-        return []
-    try:
-        return json.loads(DATA_FILE.read_text("utf-8"))
-    except:
-        return []
+    return storage.users.all()
+
+def token_from_request(request: Request, creds: Optional[HTTPAuthorizationCredentials] = None) -> Optional[str]:
+    if creds and creds.credentials:
+        return creds.credentials
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+    return request.cookies.get("access_token")
 
 # ---------------- DECODIFICAR TOKEN ----------------
 
 def decode_token(token: str):
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return decode_access_token(token)
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-# ---------------- PEGAR USUÁRIO LOGADO ----------------
+def get_current_claims(request: Request, creds: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    """Claims of the bearer token or, failing that, of the access_token cookie."""
+    token = token_from_request(request, creds)
+    if not token:
+        raise HTTPException(status_code=401, detail="Não autenticado", headers={"WWW-Authenticate": "Bearer"})
+    return decode_token(token)
 
-def get_current_user(creds: HTTPAuthorizationCredentials = Depends(security)):
-    token = creds.credentials
-    payload = decode_token(token)
+# ---------------- PEGAR USUÁRIO LOGADO ----------------
 
+def get_current_user(payload: dict = Depends(get_current_claims)):
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    users = read_users()
-    user = next((u for u in users if u.get("id") == user_id), None)
+    user = user_repo.get_by_id(user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
@@ -0,0 +1,414 @@
+# backend/core/segment_log.py
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("ghostai")
+
+FSYNC_POLICIES = ("always", "interval", "never")
+# archives are written as one gzip member per block of lines, so a record can be
+# read back by decompressing just its block (see SegmentLog.get)
+ARCHIVE_BLOCK_BYTES = 64 * 1024
+
+class SegmentLog:
+    """
+    Append-only JSONL log split into segments:
+
+        segment-00000001.jsonl     (sealed, waiting for compaction)
+        segment-00000002.jsonl     (active, receives appends)
+        archive-00000001.jsonl.gz  (compacted segments, oldest data)
+
+    An append is one write() of one line, so its cost does not depend on how
+    many records already exist. A crash can at most leave a torn last line,
+    which the reader skips.
+
+    fsync policy:
+      always   - fsync after every append (default, nothing acknowledged is lost)
+      interval - fsync at most every `fsync_interval` seconds
+      never    - leave it to the OS
+
+    With `index_field`, an in-memory index maps that field to where its record
+    lives (segment + byte offset, or archive + gzip member offset). It is kept
+    up to date on append and compaction, and caught up incrementally with what
+    other processes wrote, so get() does not scale with the size of the log.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        fsync: str = "always",
+        fsync_interval: float = 1.0,
+        max_segment_bytes: int = 4 * 1024 * 1024,
+        index_field: Optional[str] = None,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy inválida: {fsync}")
+        self.directory = Path(directory)
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_segment_bytes = max_segment_bytes
+        self._lock = threading.Lock()
+        self._fh = None
+        self._seq = 0
+        self._last_fsync = 0.0
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.index_field = index_field
+        # key -> (file name, offset); None until built
+        self._index: Optional[Dict[str, Tuple[str, int]]] = None
+        # file name -> bytes already indexed (segments) or True (archives)
+        self._indexed: Dict[str, object] = {}
+
+    # ---------------- ARQUIVOS ----------------
+
+    @staticmethod
+    def _seq_of(path: Path) -> int:
+        return int(path.name.split("-", 1)[1].split(".", 1)[0])
+
+    def _segments(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("segment-*.jsonl"), key=self._seq_of)
+
+    def _archives(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("archive-*.jsonl.gz"), key=self._seq_of)
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"segment-{seq:08d}.jsonl"
+
+    def _open_active(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        last_segment = max([self._seq_of(p) for p in self._segments()] or [0])
+        last_archive = max([self._seq_of(p) for p in self._archives()] or [0])
+        # keep appending to the newest segment, unless it was already archived
+        self._seq = last_segment if last_segment > last_archive else max(last_segment, last_archive) + 1
+        self._fh = open(self._segment_path(self._seq), "ab")
+
+    def _active_is_stale(self) -> bool:
+        # the compactor (possibly in another process) removed our segment
+        return self._fh is None or os.fstat(self._fh.fileno()).st_nlink == 0
+
+    def _rotate(self):
+        self._sync(force=True)
+        self._fh.close()
+        self._seq += 1
+        self._fh = open(self._segment_path(self._seq), "ab")
+
+    def _sync(self, force: bool = False):
+        if self._fh is None:
+            return
+        self._fh.flush()
+        if self.fsync == "never" and not force:
+            return
+        now = time.monotonic()
+        if force or self.fsync == "always" or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._fh.fileno())
+            self._last_fsync = now
+
+    # ---------------- ESCRITA ----------------
+
+    def append(self, record: Dict) -> Dict:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._active_is_stale():
+                if self._fh is not None:
+                    self._fh.close()
+                self._open_active()
+            elif self._fh.tell() + len(line) > self.max_segment_bytes and self._fh.tell() > 0:
+                self._rotate()
+            self._fh.write(line)
+            self._sync()
+            if self._index is not None:
+                self._index_appended(record, line)
+        return record
+
+    def _index_appended(self, record: Dict, line: bytes):
+        # _sync flushed: tell() is where our O_APPEND write ended
+        end = self._fh.tell()
+        name = self._segment_path(self._seq).name
+        key = record.get(self.index_field)
+        if key is not None:
+            self._index[str(key)] = (name, end - len(line))
+        # only move the mark over contiguous data; another process's lines are left to _catch_up
+        if self._indexed.get(name, 0) == end - len(line):
+            self._indexed[name] = end
+
+    def flush(self):
+        with self._lock:
+            self._sync(force=True)
+
+    def close(self):
+        self.stop_compactor()
+        with self._lock:
+            if self._fh is not None:
+                self._sync(force=True)
+                self._fh.close()
+                self._fh = None
+
+    # ---------------- LEITURA ----------------
+
+    @staticmethod
+    def _parse_lines(lines) -> Iterator[Dict]:
+        for raw in lines:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                yield json.loads(raw)
+            except ValueError:
+                # torn write from a crash: skip it, keep the rest
+                continue
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.iter_records()
+
+    def _open_all(self) -> List[Tuple[Path, BinaryIO]]:
+        """
+        Open every archive and segment in one snapshot. compact() swaps files
+        under the same lock, and an open handle stays readable after its file
+        is unlinked, so a slow reader sees each record exactly once.
+        """
+        while True:
+            with self._lock:
+                if self._fh is not None:
+                    self._fh.flush()
+                paths = self._archives() + self._segments()
+                handles = []
+                try:
+                    for path in paths:
+                        handles.append(open(path, "rb"))
+                except FileNotFoundError:
+                    # compacted by another process between listing and opening: list again
+                    for fh in handles:
+                        fh.close()
+                    continue
+            return list(zip(paths, handles))
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Yield every record, oldest first, one line at a time (constant memory)."""
+        opened = self._open_all()
+        try:
+            for path, fh in opened:
+                if path.name.endswith(".gz"):
+                    with gzip.open(fh, "rb") as gz:
+                        yield from self._parse_lines(gz)
+                else:
+                    yield from self._parse_lines(fh)
+        finally:
+            for _, fh in opened:
+                fh.close()
+
+    # ---------------- ÍNDICE ----------------
+
+    @staticmethod
+    def _archive_lines(fh: BinaryIO, single_member: bool = False) -> Iterator[Tuple[int, bytes]]:
+        """(offset of the gzip member, line) for every line of an archive, from fh's position."""
+        start = fh.tell()
+        decomp, pending = zlib.decompressobj(31), b""
+        while True:
+            chunk = fh.read(ARCHIVE_BLOCK_BYTES)
+            if not chunk:
+                break
+            data = chunk
+            while data:
+                pending += decomp.decompress(data)
+                *lines, pending = pending.split(b"\n")
+                for raw in lines:
+                    yield start, raw
+                if not decomp.eof:
+                    break
+                # member finished: the rest of `data` starts the next one
+                if pending:
+                    yield start, pending
+                    pending = b""
+                data = decomp.unused_data
+                if single_member:
+                    return
+                start = fh.tell() - len(data)
+                decomp = zlib.decompressobj(31)
+        if pending:
+            yield start, pending
+
+    def _key_of(self, raw: bytes) -> Optional[str]:
+        if not raw.strip():
+            return None
+        try:
+            key = json.loads(raw).get(self.index_field)
+        except (ValueError, AttributeError):
+            return None
+        return None if key is None else str(key)
+
+    def _scan(self, path: Path, fh: BinaryIO, done) -> Tuple[Dict[str, Tuple[str, int]], object]:
+        """Index entries of one file from its mark on, and the new mark."""
+        entries = {}
+        if path.name.endswith(".gz"):
+            for offset, raw in self._archive_lines(fh):
+                key = self._key_of(raw)
+                if key is not None:
+                    entries[key] = (path.name, offset)
+            return entries, True
+        fh.seek(done)
+        for raw in fh:
+            if not raw.endswith(b"\n"):
+                break  # torn, or still being written: next time
+            key = self._key_of(raw)
+            if key is not None:
+                entries[key] = (path.name, done)
+            done += len(raw)
+        return entries, done
+
+    def _catch_up(self):
+        """Index whatever isn't yet: new archives, and segment bytes past their mark."""
+        opened = self._open_all()
+        with self._lock:
+            marks = dict(self._indexed) if self._index is not None else {}
+        found = []
+        try:
+            # scanned without the lock, so appends don't wait on it
+            for path, fh in opened:
+                done = marks.get(path.name, 0)
+                if done is not True:
+                    found.append((path.name, *self._scan(path, fh, done)))
+        finally:
+            for _, fh in opened:
+                fh.close()
+        with self._lock:
+            if self._index is None:
+                self._index, self._indexed = {}, {}
+            # compact() unlinks under this lock: entries of files gone meanwhile are stale
+            current = {p.name for p in self._archives() + self._segments()}
+            for name, entries, mark in found:
+                if name not in current:
+                    continue
+                self._index.update(entries)
+                previous = self._indexed.get(name, 0)
+                if mark is True or (previous is not True and mark > previous):
+                    self._indexed[name] = mark
+            for name in [n for n in self._indexed if n not in current]:
+                del self._indexed[name]
+
+    def build_index(self):
+        """Index the whole log now (e.g. at startup) instead of on the first get()."""
+        if self.index_field:
+            self._catch_up()
+
+    def _read_at(self, key: str, location: Tuple[str, int]) -> Optional[Dict]:
+        name, offset = location
+        try:
+            with open(self.directory / name, "rb") as fh:
+                fh.seek(offset)
+                if name.endswith(".gz"):
+                    lines = (raw for _, raw in self._archive_lines(fh, single_member=True))
+                else:
+                    lines = iter([fh.readline()])
+                for record in self._parse_lines(lines):
+                    if str(record.get(self.index_field)) == key:
+                        return record
+        except (FileNotFoundError, zlib.error, EOFError):
+            pass
+        return None
+
+    def get(self, key) -> Optional[Dict]:
+        """The record whose `index_field` equals `key` (latest one if repeated), or None."""
+        if not self.index_field:
+            raise ValueError("log sem index_field")
+        key = str(key)
+        if self._index is None:
+            self._catch_up()
+        location = self._index.get(key)
+        record = self._read_at(key, location) if location else None
+        if record is None:
+            # written or compacted by another process since: index the new data, try again
+            self._catch_up()
+            location = self._index.get(key)
+            record = self._read_at(key, location) if location else None
+        return record
+
+    def is_empty(self) -> bool:
+        return not self._segments() and not self._archives()
+
+    # ---------------- COMPACTAÇÃO ----------------
+
+    def compact(self, min_age: float = 60.0) -> Optional[Path]:
+        """
+        Merge sealed segments (all but the newest, untouched for `min_age`
+        seconds) into a single gzip archive. The archive is written to a temp
+        file and renamed into place before the segments are removed.
+        """
+        now = time.time()
+        sealed = []
+        # only a contiguous prefix of old segments, so archives stay in order
+        for path in self._segments()[:-1]:
+            if now - path.stat().st_mtime < min_age:
+                break
+            sealed.append(path)
+        if not sealed:
+            return None
+        archive = self.directory / f"archive-{self._seq_of(sealed[-1]):08d}.jsonl.gz"
+        tmp = archive.with_suffix(".tmp")
+        moved: Dict[str, int] = {}
+        with open(tmp, "wb") as out:
+            block, size = [], 0
+            for path in sealed:
+                with open(path, "rb") as fh:
+                    for raw in fh:
+                        if raw.strip():
+                            block.append(raw if raw.endswith(b"\n") else raw + b"\n")
+                            size += len(block[-1])
+                            if size >= ARCHIVE_BLOCK_BYTES:
+                                self._write_member(out, block, moved)
+                                block, size = [], 0
+            if block:
+                self._write_member(out, block, moved)
+            out.flush()
+            os.fsync(out.fileno())
+        # readers snapshot the file list under this lock (see _open_all)
+        with self._lock:
+            os.replace(tmp, archive)
+            for path in sealed:
+                path.unlink(missing_ok=True)
+            if self._index is not None:
+                self._index.update((key, (archive.name, offset)) for key, offset in moved.items())
+                self._indexed[archive.name] = True
+                for path in sealed:
+                    self._indexed.pop(path.name, None)
+        return archive
+
+    def _write_member(self, out: BinaryIO, block: List[bytes], moved: Dict[str, int]):
+        offset = out.tell()
+        out.write(gzip.compress(b"".join(block), mtime=0))
+        if self.index_field:
+            for raw in block:
+                key = self._key_of(raw)
+                if key is not None:
+                    moved[key] = offset
+
+    def start_compactor(self, interval: float = 3600.0, min_age: float = 60.0):
+        if self._compactor and self._compactor.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.compact(min_age=min_age)
+                except Exception:
+                    # best-effort: segments stay readable as they are
+                    logger.exception("Erro ao compactar %s", self.directory)
+
+        self._compactor = threading.Thread(target=run, name="segment-log-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        self._stop.set()
+        if self._compactor:
+            self._compactor.join(timeout=5)
+            self._compactor = None
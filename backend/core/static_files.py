@@ -0,0 +1,81 @@
+# backend/core/static_files.py
+import mimetypes
+import os
+from pathlib import Path
+from typing import Optional, Set
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+# content-addressed files never change under the same name
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# preferred first
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for directories whose file names are content hashes: cache for a year."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Codings from an Accept-Encoding header, minus the ones refused with q=0."""
+    accepted = set()
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles over a source directory plus the fingerprinted build of it
+    (tools/build_assets.py). Files found in `build_dir` are immutable and
+    sent as their .br/.gz sibling when the client accepts it; anything else
+    is served from the source directory as plain StaticFiles would.
+    """
+
+    def __init__(self, *args, build_dir: Optional[Path] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.build_dir = Path(build_dir).resolve() if build_dir else None
+
+    def _built(self, path: str) -> Optional[Path]:
+        if not self.build_dir or not path:
+            return None
+        full = (self.build_dir / path).resolve()
+        if self.build_dir not in full.parents or not full.is_file():
+            return None
+        return full
+
+    async def get_response(self, path: str, scope):
+        built = self._built(path) if scope["method"] in ("GET", "HEAD") else None
+        if built is None:
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        target = built
+        for coding, suffix in PRECOMPRESSED:
+            candidate = built.with_name(built.name + suffix)
+            if coding in accepted and candidate.is_file():
+                target = candidate
+                headers["Content-Encoding"] = coding
+                break
+
+        media_type = mimetypes.guess_type(built.name)[0] or "application/octet-stream"
+        response = FileResponse(target, stat_result=os.stat(target), headers=headers, media_type=media_type)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,383 @@
+# backend/core/storage.py
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+DB_PATH = Path(os.getenv("GHOSTAI_DB_PATH") or DATA_DIR / "ghostai.db")
+
+# collection name -> JSON fields that get a secondary (expression) index
+COLLECTIONS = {
+    "users": ("email",),
+    "clients": ("email",),
+    "modules": (),
+    "tokens": ("type",),
+    "settings": (),
+    "uploads": ("owner", "blob"),
+}
+
+def normalize_key(value) -> str:
+    """How company names / emails are compared when matching users to clients."""
+    return str(value or "").strip().lower()
+
+# client_lookup: normalized client nome/email -> client id, kept in sync by triggers
+# on the clients table. On conflicts the oldest client (lowest rowid) keeps the key,
+# as the old linear resolver did.
+_LOOKUP_KEYS = "SELECT ghost_norm(json_extract({row}.data, '$.nome')) AS key, {row}.id AS client_id, {row}.rowid AS rid{src} UNION ALL " \
+               "SELECT ghost_norm(json_extract({row}.data, '$.email')), {row}.id, {row}.rowid{src}"
+
+def _claim_lookup_keys(row: str, src: str, keys: str = "") -> str:
+    """
+    INSERT giving each unclaimed key (optionally only those in `keys`) to its
+    oldest client. Conflicts are avoided up front rather than with OR IGNORE:
+    inside a trigger that clause is overridden by the outer statement's.
+    """
+    only = f" AND key IN ({keys})" if keys else ""
+    return (
+        "INSERT INTO client_lookup(key, client_id) SELECT key, client_id FROM ("
+        "SELECT key, client_id, MIN(rid) FROM (" + _LOOKUP_KEYS.format(row=row, src=src) + ") "
+        "WHERE key <> '' AND key NOT IN (SELECT key FROM client_lookup)" + only + " GROUP BY key)"
+    )
+
+def _row_keys(row: str) -> str:
+    return f"ghost_norm(json_extract({row}.data, '$.nome')), ghost_norm(json_extract({row}.data, '$.email'))"
+
+# bump when the triggers change: existing lookups are rebuilt once
+CLIENT_LOOKUP_VERSION = "2"
+CLIENT_LOOKUP_DDL = [
+    "CREATE TABLE IF NOT EXISTS client_lookup (key TEXT PRIMARY KEY, client_id TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS client_lookup_client_idx ON client_lookup(client_id)",
+    "DROP TRIGGER IF EXISTS clients_lookup_insert",
+    "DROP TRIGGER IF EXISTS clients_lookup_update",
+    "DROP TRIGGER IF EXISTS clients_lookup_delete",
+    "CREATE TRIGGER clients_lookup_insert AFTER INSERT ON clients BEGIN "
+    + _claim_lookup_keys("NEW", "") + "; END",
+    # update/delete: drop every key the row had or now has (whoever holds it), then
+    # let the oldest client claim them again, so a rename never takes a key from an
+    # older client nor leaves it with a newer one
+    "CREATE TRIGGER clients_lookup_update AFTER UPDATE OF data ON clients BEGIN "
+    f"DELETE FROM client_lookup WHERE client_id = NEW.id OR key IN ({_row_keys('NEW')}); "
+    + _claim_lookup_keys("c", " FROM clients c", f"{_row_keys('OLD')}, {_row_keys('NEW')}") + "; END",
+    "CREATE TRIGGER clients_lookup_delete AFTER DELETE ON clients BEGIN "
+    "DELETE FROM client_lookup WHERE client_id = OLD.id; "
+    + _claim_lookup_keys("c", " FROM clients c", _row_keys("OLD")) + "; END",
+    # users by normalized empresa, for the targeted client_id backfill
+    "CREATE INDEX IF NOT EXISTS users_empresa_key_idx ON users(ghost_norm(json_extract(data, '$.empresa')))",
+]
+
+# ---------------- REPOSITÓRIO ----------------
+
+class Repository:
+    """
+    Per-record access to one collection. Each record is a JSON document stored
+    under its `id`; every write runs in a transaction and bumps the collection
+    version, which in-memory caches use to know when to reload.
+
+    Each row also carries the collection version of its last write, so record
+    versions only ever grow (even across delete + re-create) and can be used
+    as ETags without reading the document.
+    """
+
+    def __init__(self, storage: "Storage", name: str):
+        self.storage = storage
+        self.name = name
+
+    def _bump(self, conn: sqlite3.Connection) -> int:
+        conn.execute(
+            "INSERT INTO collection_versions(name, version) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            (self.name,),
+        )
+        return conn.execute("SELECT version FROM collection_versions WHERE name = ?", (self.name,)).fetchone()[0]
+
+    def version(self) -> int:
+        row = self.storage.connect().execute(
+            "SELECT version FROM collection_versions WHERE name = ?", (self.name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def record_version(self, record_id: str) -> int:
+        """Version of one record (0 if it doesn't exist), without parsing it."""
+        if not record_id:
+            return 0
+        row = self.storage.connect().execute(
+            f"SELECT version FROM {self.name} WHERE id = ?", (record_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        if not record_id:
+            return None
+        row = self.storage.connect().execute(
+            f"SELECT data FROM {self.name} WHERE id = ?", (record_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def all(self) -> List[Dict]:
+        rows = self.storage.connect().execute(f"SELECT data FROM {self.name} ORDER BY rowid")
+        return [json.loads(r[0]) for r in rows]
+
+    def count(self) -> int:
+        return self.storage.connect().execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+
+    def ids(self) -> List[str]:
+        return [r[0] for r in self.storage.connect().execute(f"SELECT id FROM {self.name} ORDER BY rowid")]
+
+    def first(self) -> Optional[Dict]:
+        row = self.storage.connect().execute(f"SELECT data FROM {self.name} ORDER BY rowid LIMIT 1").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_one(self, field: str, value) -> Optional[Dict]:
+        row = self.storage.connect().execute(
+            f"SELECT data FROM {self.name} WHERE json_extract(data, '$.{field}') = ? LIMIT 1",
+            (value,),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_all(self, field: str, value) -> List[Dict]:
+        rows = self.storage.connect().execute(
+            f"SELECT data FROM {self.name} WHERE json_extract(data, '$.{field}') = ? ORDER BY rowid",
+            (value,),
+        )
+        return [json.loads(r[0]) for r in rows]
+
+    def upsert(self, record: Dict) -> Dict:
+        with self.storage.transaction() as conn:
+            version = self._bump(conn)
+            conn.execute(
+                f"INSERT INTO {self.name}(id, data, version) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, version = excluded.version",
+                (record["id"], json.dumps(record, ensure_ascii=False), version),
+            )
+        return record
+
+    def upsert_many(self, records: Iterable[Dict]) -> int:
+        with self.storage.transaction() as conn:
+            version = self._bump(conn)
+            cur = conn.executemany(
+                f"INSERT INTO {self.name}(id, data, version) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, version = excluded.version",
+                ((r["id"], json.dumps(r, ensure_ascii=False), version) for r in records),
+            )
+        return cur.rowcount
+
+    def update(self, record_id: str, updates: Dict) -> Optional[Dict]:
+        """Read-modify-write of a single record under one write lock."""
+        with self.storage.transaction() as conn:
+            row = conn.execute(f"SELECT data FROM {self.name} WHERE id = ?", (record_id,)).fetchone()
+            if not row:
+                return None
+            record = json.loads(row[0])
+            record.update(updates)
+            conn.execute(
+                f"UPDATE {self.name} SET data = ?, version = ? WHERE id = ?",
+                (json.dumps(record, ensure_ascii=False), self._bump(conn), record_id),
+            )
+        return record
+
+    def delete(self, record_id: str) -> bool:
+        with self.storage.transaction() as conn:
+            cur = conn.execute(f"DELETE FROM {self.name} WHERE id = ?", (record_id,))
+            if cur.rowcount:
+                self._bump(conn)
+        return cur.rowcount > 0
+
+# ---------------- ENGINE ----------------
+
+class Storage:
+    """
+    SQLite (WAL) storage shared by users, clients, modules and tokens.
+    One connection per thread; writes use BEGIN IMMEDIATE so concurrent
+    read-modify-write cycles serialize instead of clobbering each other.
+    """
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        for name in COLLECTIONS:
+            setattr(self, name, Repository(self, name))
+
+    def _open(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        # used by the client_lookup triggers and users_empresa_key_idx; must exist on every
+        # connection that writes clients or users
+        conn.create_function("ghost_norm", 1, normalize_key, deterministic=True)
+        return conn
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+            if not self._initialized:
+                self._initialize(conn)
+        return conn
+
+    def _initialize(self, conn: sqlite3.Connection):
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS collection_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS storage_meta (key TEXT PRIMARY KEY, value TEXT)")
+            for name, indexed in COLLECTIONS.items():
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} "
+                    "(id TEXT PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 0)"
+                )
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({name})")}
+                if "version" not in columns:
+                    # databases created before per-record versions
+                    conn.execute(f"ALTER TABLE {name} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                for field in indexed:
+                    conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {name}_{field}_idx "
+                        f"ON {name}(json_extract(data, '$.{field}'))"
+                    )
+            for ddl in CLIENT_LOOKUP_DDL:
+                conn.execute(ddl)
+            with self.transaction():
+                # first run on this database: bring in the legacy data/*.json files
+                if self.get_meta("json_import") is None:
+                    import_json_files(self)
+                # databases created before client_lookup existed, or filled by an older trigger
+                if self.get_meta("client_lookup") != CLIENT_LOOKUP_VERSION:
+                    self.rebuild_client_lookup()
+                    self.set_meta("client_lookup", CLIENT_LOOKUP_VERSION)
+            self._initialized = True
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connect()
+        if self._local.depth:
+            # nested call: the outer transaction commits
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    # ---------------- USUÁRIO → CLIENTE ----------------
+
+    def lookup_client_id(self, key: str) -> Optional[str]:
+        """Client id whose nome or email normalizes to `key` (one primary-key read)."""
+        key = normalize_key(key)
+        if not key:
+            return None
+        row = self.connect().execute("SELECT client_id FROM client_lookup WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def users_with_empresa(self, keys: Iterable[str], chunk: int = 500) -> List[Dict]:
+        """Users whose normalized empresa is one of `keys` (users_empresa_key_idx)."""
+        keys = sorted({normalize_key(k) for k in keys} - {""})
+        users = []
+        for i in range(0, len(keys), chunk):
+            batch = keys[i:i + chunk]
+            rows = self.connect().execute(
+                "SELECT data FROM users WHERE ghost_norm(json_extract(data, '$.empresa')) "
+                f"IN ({', '.join('?' * len(batch))}) ORDER BY rowid",
+                batch,
+            )
+            users.extend(json.loads(r[0]) for r in rows)
+        return users
+
+    def rebuild_client_lookup(self):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM client_lookup")
+            conn.execute(_claim_lookup_keys("c", " FROM clients c"))
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.connect().execute("SELECT value FROM storage_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO storage_meta(key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+# ---------------- IMPORTAÇÃO DOS JSON ANTIGOS ----------------
+
+def _read_legacy(path: Path):
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text("utf-8"))
+    except Exception:
+        return None
+
+def _legacy_user(u: dict) -> dict:
+    """Old users.json entries may carry 'senha' and no 'id' - convert to the current shape."""
+    if "id" in u:
+        return u
+    return {
+        "id": u.get("email", str(uuid.uuid4())),
+        "empresa": u.get("empresa") or u.get("company") or "",
+        "email": u.get("email"),
+        "password": u.get("senha") if u.get("senha") else u.get("password"),
+        "role": u.get("role", "user"),
+        "name": u.get("name", ""),
+    }
+
+def import_json_files(storage: "Storage", data_dir: Path = DATA_DIR) -> Dict[str, int]:
+    """
+    One-shot import of data/users.json, clients.json, modules.json and tokens.json.
+    Runs inside a single transaction; existing records with the same id are replaced.
+    """
+    imported = {}
+    with storage.transaction():
+        users = [_legacy_user(u) for u in _read_legacy(data_dir / "users.json") or []]
+        for u in users:
+            u["email"] = (u.get("email") or "").strip().lower()
+        imported["users"] = storage.users.upsert_many(users) if users else 0
+
+        clients = [c for c in _read_legacy(data_dir / "clients.json") or [] if c.get("id")]
+        imported["clients"] = storage.clients.upsert_many(clients) if clients else 0
+
+        modules = _read_legacy(data_dir / "modules.json") or {}
+        client_modules = [{"id": cid, **cfg} for cid, cfg in (modules.get("client_modules") or {}).items()]
+        imported["modules"] = storage.modules.upsert_many(client_modules) if client_modules else 0
+        if modules.get("available"):
+            storage.settings.upsert({"id": "modules.available", "value": modules["available"]})
+
+        tokens = _read_legacy(data_dir / "tokens.json") or []
+        if isinstance(tokens, dict):
+            tokens = [{"id": k, **v} for k, v in tokens.items() if isinstance(v, dict)]
+        tokens = [t for t in tokens if isinstance(t, dict) and t.get("id")]
+        imported["tokens"] = storage.tokens.upsert_many(tokens) if tokens else 0
+
+        storage.set_meta("json_import", json.dumps(imported))
+    return imported
+
+storage = Storage()
+
+if __name__ == "__main__":
+    # python backend/core/storage.py  -> re-run the JSON import by hand
+    print(import_json_files(storage))
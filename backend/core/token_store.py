@@ -0,0 +1,223 @@
+# backend/core/token_store.py
+import hashlib
+import heapq
+import os
+import secrets
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from backend.core.storage import storage
+
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+# how often expired token records are bulk-deleted from storage
+TOKEN_PURGE_INTERVAL = float(os.getenv("TOKEN_PURGE_INTERVAL", "300"))
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+class RevocationSet:
+    """
+    Revoked token ids (jti) kept in memory with their expiry. Persisted in the
+    tokens collection as {"id": jti, "type": "revoked", "exp": ...}; the set is
+    reloaded when the collection version changes, checked at most every
+    `refresh_interval` seconds, so a request never pays a storage read just to
+    ask "is this token revoked?". Entries disappear once the token would have
+    expired anyway.
+    """
+
+    def __init__(self, store=storage, refresh_interval: float = 1.0):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._revoked: Dict[str, float] = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            version = self.store.tokens.version()
+            if version == self._version and not force:
+                self._expire()
+                return
+            wall = time.time()
+            self._revoked = {
+                t["id"]: float(t.get("exp") or 0)
+                for t in self.store.tokens.find_all("type", "revoked")
+                if float(t.get("exp") or 0) > wall
+            }
+            self._version = version
+
+    def _expire(self):
+        wall = time.time()
+        for jti in [j for j, exp in self._revoked.items() if exp <= wall]:
+            del self._revoked[jti]
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        self._refresh()
+        return jti in self._revoked
+
+    def revoke(self, jti: str, exp: float):
+        self.store.tokens.upsert({"id": jti, "type": "revoked", "exp": float(exp), "revoked_at": time.time()})
+        with self._lock:
+            self._revoked[jti] = float(exp)
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._revoked)
+
+revocations = RevocationSet()
+
+# ---------------- REFRESH TOKENS ----------------
+
+class RefreshTokenStore:
+    """
+    Opaque refresh tokens persisted in the tokens collection as
+    {"id": sha256(token), "type": "refresh", "user_id", "family", "exp"}; the
+    plain token is only ever handed to the client.
+
+    Live entries are also kept in a dict (O(1) lookup by digest) with a min-heap
+    of (exp, digest), so expiry pops from the top of the heap instead of
+    scanning every token. Expired rows are removed from storage with one bulk
+    DELETE at most every `purge_interval` seconds.
+    """
+
+    def __init__(self, store=storage, ttl: float = REFRESH_TOKEN_EXPIRE_DAYS * 86400, purge_interval: float = TOKEN_PURGE_INTERVAL):
+        self.store = store
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._loaded = False
+        self._purged_at = 0.0
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            now = time.time()
+            for t in self.store.tokens.find_all("type", "refresh"):
+                if float(t.get("exp") or 0) > now:
+                    self._remember(t)
+            self._loaded = True
+
+    def _remember(self, entry: Dict):
+        self._entries[entry["id"]] = entry
+        heapq.heappush(self._heap, (float(entry["exp"]), entry["id"]))
+
+    def _expire(self, now: float):
+        # caller holds the lock; stale heap items (rotated tokens) are skipped
+        while self._heap and self._heap[0][0] <= now:
+            _, digest = heapq.heappop(self._heap)
+            entry = self._entries.get(digest)
+            if entry is not None and float(entry["exp"]) <= now:
+                del self._entries[digest]
+
+    def _lookup(self, digest: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(digest)
+        if entry is None:
+            # may have been issued by another worker process
+            entry = self.store.tokens.get(digest)
+            if not entry or entry.get("type") != "refresh" or float(entry.get("exp") or 0) <= now:
+                return None
+            with self._lock:
+                self._remember(entry)
+        return entry
+
+    def issue(self, user_id: str, family: Optional[str] = None) -> str:
+        self._load()
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        entry = {
+            "id": _digest(token),
+            "type": "refresh",
+            "user_id": user_id,
+            "family": family or uuid.uuid4().hex,
+            "exp": now + self.ttl,
+            "created_at": now,
+        }
+        self.store.tokens.upsert(entry)
+        with self._lock:
+            self._remember(entry)
+        self.purge_expired()
+        return token
+
+    def get(self, token: str) -> Optional[Dict]:
+        self._load()
+        return self._lookup(_digest(token)) if token else None
+
+    def rotate(self, token: str) -> Optional[Tuple[Dict, str]]:
+        """
+        Consume `token` and issue its successor in the same family. Returns
+        (old entry, new token), or None when the token is unknown, expired or
+        was already used — only one of two concurrent rotations wins.
+        """
+        entry = self.get(token)
+        if entry is None:
+            return None
+        with self.store.transaction():
+            if not self.store.tokens.delete(entry["id"]):
+                self.discard(entry["id"])
+                return None
+            new_token = self.issue(entry["user_id"], family=entry["family"])
+        self.discard(entry["id"])
+        return entry, new_token
+
+    def discard(self, digest: str):
+        with self._lock:
+            # its heap item is dropped lazily by _expire
+            self._entries.pop(digest, None)
+
+    def revoke(self, token: str) -> bool:
+        digest = _digest(token or "")
+        self.discard(digest)
+        return self.store.tokens.delete(digest)
+
+    def revoke_user(self, user_id: str) -> int:
+        """Revoke every refresh token of `user_id` (password change, "log out everywhere")."""
+        self._load()
+        digests = [t["id"] for t in self.store.tokens.find_all("type", "refresh") if t.get("user_id") == user_id]
+        with self.store.transaction():
+            for digest in digests:
+                self.store.tokens.delete(digest)
+        for digest in digests:
+            self.discard(digest)
+        return len(digests)
+
+    def purge_expired(self, force: bool = False) -> int:
+        """Drop expired refresh tokens and revocations, in memory and in storage."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if not force and now - self._purged_at < self.purge_interval:
+                return 0
+            self._purged_at = now
+        with self.store.transaction() as conn:
+            cur = conn.execute(
+                "DELETE FROM tokens WHERE json_extract(data, '$.type') IN ('refresh', 'revoked') "
+                "AND json_extract(data, '$.exp') <= ?",
+                (now,),
+            )
+            if cur.rowcount:
+                self.store.tokens._bump(conn)
+        return cur.rowcount
+
+    def __len__(self) -> int:
+        self._load()
+        with self._lock:
+            self._expire(time.time())
+            return len(self._entries)
+
+refresh_tokens = RefreshTokenStore()
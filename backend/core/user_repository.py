@@ -0,0 +1,76 @@
+# backend/core/user_repository.py
+import threading
+from typing import Dict, List, Optional
+from backend.core.storage import storage
+from backend.core.collection_index import CollectionIndex
+
+# ---------------- UTILIDADES ----------------
+
+def normalize_email(email: Optional[str]) -> str:
+    return (email or "").strip().lower()
+
+# ---------------- REPOSITÓRIO ----------------
+
+class UserRepository:
+    """
+    Keeps the users collection in memory with hash indexes by id and by
+    normalized email. It is only reloaded when the collection version in
+    storage changes, so a lookup costs one indexed read instead of a full
+    parse + linear scan.
+    Returned dicts are shared with the index: callers must not mutate them.
+    """
+
+    def __init__(self, store=storage):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version = None
+        self._users: List[Dict] = []
+        self._by_id: Dict[str, Dict] = {}
+        self._by_email: Dict[str, Dict] = {}
+
+    def _refresh(self):
+        if self.store.users.version() == self._version:
+            return
+        with self._lock:
+            version = self.store.users.version()
+            if version == self._version:
+                return
+            users = self.store.users.all()
+            by_id, by_email = {}, {}
+            for u in users:
+                if u.get("id"):
+                    by_id[u["id"]] = u
+                email = normalize_email(u.get("email"))
+                if email:
+                    by_email.setdefault(email, u)
+            self._users, self._by_id, self._by_email = users, by_id, by_email
+            self._version = version
+
+    def invalidate(self):
+        """Force a reload on the next lookup."""
+        with self._lock:
+            self._version = None
+
+    def all(self) -> List[Dict]:
+        self._refresh()
+        return list(self._users)
+
+    def get_by_id(self, user_id: Optional[str]) -> Optional[Dict]:
+        if not user_id:
+            return None
+        self._refresh()
+        return self._by_id.get(user_id)
+
+    def get_by_email(self, email: Optional[str]) -> Optional[Dict]:
+        key = normalize_email(email)
+        if not key:
+            return None
+        self._refresh()
+        return self._by_email.get(key)
+
+user_repo = UserRepository()
+
+# admin listings: paginated / sorted view without password hashes
+user_index = CollectionIndex(
+    storage.users, sort_fields=("created_at", "email", "name", "empresa", "role"), hidden=("password",), filter_fields=("role",),
+)
@@ -1,34 +1,46 @@
 # backend/main.py
 import os
 import json
+import time
 import logging
+from urllib.parse import urlparse
 from pathlib import Path
-from io import BytesIO
 from datetime import timedelta
 
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-import requests
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-
 from dotenv import load_dotenv
-from jose import JWTError, jwt
 
 # --- carregar .env (usa .env da raiz do projeto) ---
 HERE = Path(__file__).resolve().parents[1]
 ENV_PATH = HERE.parent / ".env"
 load_dotenv(dotenv_path=ENV_PATH)
 
+# imported after .env so their module-level config sees it
+from backend.core.job_queue import job_queue
+from backend.services import email_service  # registers the onboarding.notify job handler
+from backend.services.lead_service import save_lead, start_lead_log, stop_lead_log
+from backend.services.pdf_service import shutdown_pdf_pool
+from backend.services.client_service import schedule_client_backfill  # registers users.backfill_client_id
+from backend.services.kpi_service import client_id_for_tenant, record_chat
+from backend.core.admin_stats import admin_stats
+from backend.core.fair_scheduler import SchedulerBusy
+from backend.core.hashing import HasherBusy, PasswordTooLong, hasher
+from backend.core.static_files import ImmutableStaticFiles, PrecompressedStaticFiles
+from backend.core.body_limit import BodySizeLimit
+from backend.core.file_manager import UPLOAD_MAX_BYTES, UPLOAD_FORM_OVERHEAD
+from backend.core.assets import STATIC_MOUNTS, assets, asset_url, mount_build_dir
+from backend.services.theme_service import THEME_CSS_DIR, THEME_CSS_URL
+from backend.services.ollama_service import ollama_client, llm_scheduler, OllamaError, OllamaTimeout
+from backend.services.faq_service import faq_index
+from backend.services.chat_service import chat_cache, chat_cache_key, conversations
+
 # --- logging ---
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("ghostai")
@@ -41,20 +53,6 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 FRONTEND_DIR = BASE_DIR / "frontend"
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(exist_ok=True)
-ONBOARDING_FILE = DATA_DIR / "onboarding.json"
-
-# env vars
-SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
-SMTP_USER = os.getenv("SMTP_USER")
-SMTP_PASS = os.getenv("SMTP_PASS")
-ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", SMTP_USER or "")
-
-OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/chat")
-OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen2.5")
-
-SECRET_KEY = os.getenv("SECRET_KEY", "change_this_secret")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
 # --- CORS (ajuste em produção) ---
 app.add_middleware(
@@ -65,18 +63,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- uploads: refuse oversized bodies before the multipart parser spools them to disk ---
+app.add_middleware(BodySizeLimit, limits={"/api/account/avatar": UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD})
+
+# --- login storms: answer 503 fast instead of piling up bcrypt work ---
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request: Request, exc: HasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servidor ocupado, tente novamente em instantes."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(PasswordTooLong)
+async def password_too_long_handler(request: Request, exc: PasswordTooLong):
+    # bcrypt can't take it: a bad request, not a server error
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 # --- static mounts (frontend) ---
-app.mount("/landing-static", StaticFiles(directory=FRONTEND_DIR / "landing" / "static"), name="landing-static")
-app.mount("/landing-js", StaticFiles(directory=FRONTEND_DIR / "landing" / "js"), name="landing-js")
-app.mount("/dashboard-static", StaticFiles(directory=FRONTEND_DIR / "dashboard"), name="dashboard-static")
-app.mount("/login-static", StaticFiles(directory=FRONTEND_DIR / "login"), name="login-static")
+# fingerprinted + precompressed copies come from `python -m backend.tools.build_assets`
+for prefix, rel in STATIC_MOUNTS.items():
+    app.mount(prefix, PrecompressedStaticFiles(directory=FRONTEND_DIR / rel, build_dir=mount_build_dir(prefix)), name=prefix.strip("/"))
 # expose uploads if you save there
 UPLOADS_DIR = FRONTEND_DIR / "dashboard" / "assets" / "user_uploads"
-if UPLOADS_DIR.exists():
-    app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+(UPLOADS_DIR / "blobs").mkdir(exist_ok=True)
+# blobs (and their variants) are named by content hash: cache them for good
+app.mount("/uploads/blobs", ImmutableStaticFiles(directory=UPLOADS_DIR / "blobs"), name="upload-blobs")
+app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+# compiled per-client theme CSS (services/theme_service.py), named by content hash
+THEME_CSS_DIR.mkdir(parents=True, exist_ok=True)
+app.mount(THEME_CSS_URL, ImmutableStaticFiles(directory=THEME_CSS_DIR), name="theme-css")
 
 # --- templates (dashboard dynamic) ---
 templates = Jinja2Templates(directory=str(HERE / "templates"))
+templates.env.globals["asset"] = asset_url
 
 # --- include routers if exist (graceful) ---
 try:
@@ -85,7 +106,7 @@ try:
 except Exception as e:
     logger.warning("Router auth not included: %s", e)
 
-for module_name in ("account", "client", "admin", "dashboard"):
+for module_name in ("account", "client", "admin", "dashboard", "dashboard_data", "modules", "leads", "images"):
     try:
         mod = __import__(f"backend.routes.{module_name}", fromlist=["router"])
         app.include_router(mod.router)
@@ -94,180 +115,207 @@ for module_name in ("account", "client", "admin", "dashboard"):
         pass
 
 # ---------------------------
-# Utils: token extraction from cookie
+# Onboarding storage (pdf / email run in the job queue, see services/email_service.py)
 # ---------------------------
-def get_current_user_from_cookie(request: Request):
-    token = request.cookies.get("access_token")
-    if not token:
-        return None
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        return None
+def save_data(data: dict):
+    # append-only: one JSONL line per submission (see services/lead_service.py)
+    return save_lead(data)
 
 # ---------------------------
-# Onboarding storage / pdf / email (kept compatible com sua versão)
+# Lifecycle
 # ---------------------------
-def save_data(data: dict):
-    ONBOARDING_FILE.parent.mkdir(parents=True, exist_ok=True)
-    try:
-        existing = json.loads(ONBOARDING_FILE.read_text("utf-8")) if ONBOARDING_FILE.exists() else []
-    except Exception:
-        existing = []
-    existing.append(data)
-    ONBOARDING_FILE.write_text(json.dumps(existing, indent=4, ensure_ascii=False), "utf-8")
-
-def generate_pdf(data: dict) -> bytes:
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    x, y = 40, 800
-
-    def section(title):
-        nonlocal y
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(x, y, title)
-        y -= 20
-        c.setLineWidth(1)
-        c.line(x, y, x + 500, y)
-        y -= 20
-
-    def line(label, value):
-        nonlocal y
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(x, y, f"{label}:")
-        c.setFont("Helvetica", 10)
-        c.drawString(x + 140, y, str(value or "-"))
-        y -= 18
-
-    def block(label, text):
-        nonlocal y
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(x, y, f"{label}:")
-        y -= 16
-        c.setFont("Helvetica", 10)
-        if not text: text = "-"
-        paragraphs = [text[i:i+90] for i in range(0, len(text), 90)]
-        for p in paragraphs:
-            c.drawString(x + 10, y, p)
-            y -= 14
-        y -= 10
-
-    section("Informações Básicas")
-    line("Nome", data.get("nome"))
-    line("Email", data.get("email"))
-    line("WhatsApp", data.get("whatsapp"))
-    line("Empresa", data.get("empresa"))
-
-    section("Diagnóstico")
-    line("Segmento", data.get("segmento"))
-    line("Volume diário", data.get("volume"))
-    line("Canais", ", ".join(data.get("canal", [])))
-    line("Objetivos", ", ".join(data.get("objetivo", [])))
-
-    section("Descrição Geral")
-    block("Resumo do negócio", data.get("descricao", "Não informado"))
-
-    c.setFont("Helvetica-Oblique", 9)
-    c.drawString(40, 40, "Gerado automaticamente pelo GhostAI 👻")
-    c.save()
-    return buffer.getvalue()
-
-def send_email_with_pdf(data: dict):
-    if not SMTP_USER or not SMTP_PASS:
-        logger.warning("Envio de e-mail desativado (credenciais não configuradas).")
-        return
-
-    pdf_bytes = generate_pdf(data)
-
-    html_body = f"""
-    <!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8"></head><body>
-    <h2>Novo Lead Recebido</h2>
-    <p>Nome: {data.get('nome','-')}</p>
-    <p>Email: {data.get('email','-')}</p>
-    <p>WhatsApp: {data.get('whatsapp','-')}</p>
-    <p>Empresa: {data.get('empresa','-')}</p>
-    </body></html>
-    """
-
-    msg = MIMEMultipart("alternative")
-    msg["From"] = SMTP_USER
-    msg["To"] = ADMIN_EMAIL
-    msg["Subject"] = "Novo Lead - GhostAI"
-    msg.attach(MIMEText(html_body, "html", "utf-8"))
-    pdf_attachment = MIMEApplication(pdf_bytes, _subtype="pdf")
-    pdf_attachment.add_header("Content-Disposition", "attachment", filename="lead_ghostai.pdf")
-    msg.attach(pdf_attachment)
-
-    try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.sendmail(SMTP_USER, ADMIN_EMAIL, msg.as_string())
-        logger.info("Email enviado com sucesso para %s", ADMIN_EMAIL)
-    except Exception as e:
-        logger.exception("Erro ao enviar email: %s", e)
+@app.on_event("startup")
+def on_startup():
+    start_lead_log()
+    faq_index.refresh()
+    admin_stats.ensure()
+    schedule_client_backfill()
+    job_queue.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    job_queue.stop()
+    stop_lead_log()
+    shutdown_pdf_pool()
+    hasher.shutdown()
+    await ollama_client.aclose()
 
 # ---------------------------
 # Routes: landing + onboarding + chat (compatíveis)
 # ---------------------------
 @app.get("/", response_class=FileResponse)
 def home():
-    return FileResponse(FRONTEND_DIR / "landing" / "index.html")
+    return FileResponse(assets.page("landing/index.html"))
 
 @app.get("/checkout", response_class=FileResponse)
 def checkout():
-    return FileResponse(FRONTEND_DIR / "landing" / "checkout.html")
+    return FileResponse(assets.page("landing/checkout.html"))
 
 @app.get("/onboarding", response_class=FileResponse)
 def onboarding_page():
-    return FileResponse(FRONTEND_DIR / "landing" / "onboarding.html")
+    return FileResponse(assets.page("landing/onboarding.html"))
 
 @app.get("/success", response_class=FileResponse)
 def success_page():
-    return FileResponse(FRONTEND_DIR / "landing" / "success.html")
+    return FileResponse(assets.page("landing/success.html"))
 
 @app.get("/login", response_class=FileResponse)
 def login_page():
-    return FileResponse(FRONTEND_DIR / "login" / "index.html")
+    return FileResponse(assets.page("login/index.html"))
 
-@app.get("/dashboard", response_class=FileResponse)
-def dashboard_page(request: Request):
-    user = get_current_user_from_cookie(request)
-    if not user:
-        return RedirectResponse("/login")
-    # serve single dashboard entry (frontend fetchará dados via API)
-    return FileResponse(FRONTEND_DIR / "dashboard" / "index.html")
+def _accept_lead(data: dict, tenant_header: str = None) -> str:
+    # leads captured on a client's page count towards that client's dashboard
+    client_id = client_id_for_tenant(data.get("client_id") or data.get("tenant") or tenant_header)
+    if client_id:
+        data["client_id"] = client_id
+    lead = save_data(data)
+    # PDF + SMTP run in the job queue workers, never on the event loop
+    return job_queue.enqueue("onboarding.notify", lead)
 
 @app.post("/api/onboarding")
 async def receive_form(request: Request):
     data = await request.json()
-    save_data(data)
-    # send email async would be better; here synchronous for compatibility
-    try:
-        send_email_with_pdf(data)
-    except Exception:
-        logger.exception("Erro no envio de email (onboarding)")
-    return {"success": True, "redirect": "/success"}
+    # the log append (fsync), KPI counters and enqueue are all disk writes: keep them off the loop
+    job_id = await run_in_threadpool(_accept_lead, data, request.headers.get("x-tenant-id"))
+    return {"success": True, "redirect": "/success", "job_id": job_id}
 
-@app.post("/api/chat")
-async def api_chat(req: Request):
-    payload = await req.json()
+def _chat_message(payload: dict) -> str:
     msg = payload.get("message")
-    history = payload.get("history", [])
     if not msg:
         raise HTTPException(status_code=400, detail="Mensagem é obrigatória")
+    return msg
+
+def _chat_tenant(req: Request, payload: dict) -> str:
+    """Landing page the chat came from: explicit tenant, else Origin/Referer host, else client IP."""
+    tenant = payload.get("tenant") or req.headers.get("x-tenant-id")
+    if tenant:
+        return str(tenant)
+    for header in ("origin", "referer"):
+        host = urlparse(req.headers.get(header, "")).hostname
+        if host:
+            return host
+    return req.client.host if req.client else "anon"
+
+async def _acquire_model_slot(tenant: str):
     try:
-        r = requests.post(
-            OLLAMA_URL,
-            json={"model": OLLAMA_MODEL, "messages": history + [{"role": "user", "content": msg}]},
-            timeout=8
+        return await llm_scheduler.acquire(tenant)
+    except SchedulerBusy as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas conversas ao mesmo tempo, tente novamente em instantes.",
+            headers={"Retry-After": str(int(e.retry_after))},
         )
-        reply = r.json().get("message", {}).get("content", "")
-        return {"reply": reply}
+
+def _server_timing(queue_wait: float, model_time: float = None) -> str:
+    timing = f"queue;dur={queue_wait * 1000:.1f}"
+    if model_time is not None:
+        timing += f", model;dur={model_time * 1000:.1f}"
+    return timing
+
+async def _open_conversation(req: Request, payload: dict):
+    """Server-side conversation for this turn; `history` is only used to seed a new one (old clients)."""
+    tenant = _chat_tenant(req, payload)
+    conv = conversations.get_or_create(payload.get("conversation_id"), tenant, payload.get("history"))
+    if conv["id"] != payload.get("conversation_id"):
+        # the KPI counter is a SQLite write transaction
+        await run_in_threadpool(record_chat, tenant)
+    return conv, tenant
+
+def _instant_reply(conv: dict, message: str):
+    """FAQ index first, then the response cache; None means the model has to answer."""
+    faq = faq_index.match(message)
+    if faq:
+        return {"reply": faq["answer"], "source": "faq", "faq_key": faq["key"]}
+    cached = chat_cache.get(chat_cache_key(ollama_client.model, conv["turns"], message))
+    if cached is not None:
+        return {"reply": cached, "source": "cache"}
+    return None
+
+def _remember_reply(conv: dict, message: str, reply: str):
+    if reply:
+        chat_cache.set(chat_cache_key(ollama_client.model, conv["turns"], message), reply)
+    conversations.append(conv, message, reply)
+
+@app.post("/api/chat")
+async def api_chat(req: Request):
+    payload = await req.json()
+    message = _chat_message(payload)
+    conv, tenant = await _open_conversation(req, payload)
+    instant = _instant_reply(conv, message)
+    if instant:
+        conversations.append(conv, message, instant["reply"])
+        return {**instant, "conversation_id": conv["id"]}
+    ticket = await _acquire_model_slot(tenant)
+    started = time.monotonic()
+    try:
+        reply = await ollama_client.chat(conversations.messages_for(conv, message))
+        _remember_reply(conv, message, reply)
     except Exception:
         logger.exception("Erro ao consultar Ollama")
-        return {"reply": "IA indisponível no momento."}
+        reply = "IA indisponível no momento."
+    finally:
+        llm_scheduler.release(ticket)
+    timing = _server_timing(ticket.queue_wait, time.monotonic() - started)
+    return JSONResponse(
+        {"reply": reply, "source": "model", "conversation_id": conv["id"]},
+        headers={"Server-Timing": timing},
+    )
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/chat/stream")
+async def api_chat_stream(req: Request):
+    """Same as /api/chat, but forwards tokens as server-sent events as soon as Ollama emits them."""
+    payload = await req.json()
+    message = _chat_message(payload)
+    conv, tenant = await _open_conversation(req, payload)
+    instant = _instant_reply(conv, message)
+    if instant:
+        conversations.append(conv, message, instant["reply"])
+
+        async def instant_events():
+            yield _sse("token", {"content": instant.pop("reply")})
+            yield _sse("done", {**instant, "conversation_id": conv["id"]})
+        return StreamingResponse(instant_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    messages = conversations.messages_for(conv, message)
+    ticket = await _acquire_model_slot(tenant)
+
+    async def events():
+        started = time.monotonic()
+        parts = []
+        try:
+            async for chunk in ollama_client.stream_chat(messages):
+                parts.append(chunk)
+                yield _sse("token", {"content": chunk})
+            _remember_reply(conv, message, "".join(parts))
+            yield _sse("done", {"source": "model",
+                                "conversation_id": conv["id"],
+                                "queue_ms": round(ticket.queue_wait * 1000, 1),
+                                "model_ms": round((time.monotonic() - started) * 1000, 1)})
+        except OllamaTimeout as e:
+            logger.warning("Timeout no Ollama: %s", e)
+            yield _sse("error", {"reply": "IA indisponível no momento.", "conversation_id": conv["id"]})
+        except OllamaError:
+            logger.exception("Erro ao consultar Ollama")
+            yield _sse("error", {"reply": "IA indisponível no momento.", "conversation_id": conv["id"]})
+        finally:
+            llm_scheduler.release(ticket)
+
+    try:
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                     "X-Conversation-Id": conv["id"],
+                     "Server-Timing": _server_timing(ticket.queue_wait)},
+            # a generator that never starts (client gone first) never runs its finally
+            background=BackgroundTask(llm_scheduler.release, ticket),
+        )
+    except BaseException:
+        llm_scheduler.release(ticket)
+        raise
 
 # health
 @app.get("/health")
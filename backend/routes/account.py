@@ -1,16 +1,21 @@
 # backend/routes/account.py
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
 from core.security_user import get_current_user
-from services.account_service import update_user, change_user_password
-from backend.core.file_manager import save_upload
+from services.account_service import update_user, change_user_password, user_version
+from backend.core.etag import make_etag, etag_matches, not_modified, json_with_etag
+from backend.core.file_manager import save_upload, release_upload, UploadTooLarge
+from backend.services.image_service import schedule_variants
 
 router = APIRouter(prefix="/api/account", tags=["account"])
 
 # ---------------- GET PERFIL ----------------
 
 @router.get("/me")
-def get_profile(user=Depends(get_current_user)):
-    return user
+def get_profile(request: Request, user=Depends(get_current_user)):
+    etag = make_etag("account.me", user["id"], user_version(user["id"]))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_with_etag(user, etag)
 
 # ---------------- UPDATE PERFIL ----------------
 
@@ -47,11 +52,17 @@ def update_password(payload: dict, user=Depends(get_current_user)):
 @router.post("/avatar")
 async def upload_avatar(file: UploadFile = File(...), user=Depends(get_current_user)):
 
-    ok, path = save_upload(file, user["id"])
+    try:
+        ok, path = await save_upload(file, user["id"])
+    except UploadTooLarge as e:
+        raise HTTPException(413, f"Arquivo muito grande ({e})")
 
     if not ok:
         raise HTTPException(400, "Formato não permitido")
 
     update_user(user["id"], {"avatar": path})
+    schedule_variants(path)
+    if user.get("avatar") and user["avatar"] != path:
+        release_upload(user["id"], user["avatar"])
 
     return {"avatar": path}
@@ -1,27 +1,204 @@
 # backend/routes/admin.py
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from core.security_user import get_admin_user
-from services.account_service import read_users
-from services.client_service import read_clients
+from services.account_service import users_version
+from services.client_service import list_clients_page, clients_version, schedule_client_backfill
+from backend.core.user_repository import user_index
+from backend.core.collection_index import list_page
+from backend.core.etag import make_etag, etag_matches, not_modified, json_with_etag
+from backend.core.admin_stats import admin_stats
+from backend.core.kpi_engine import kpis, ALL_TENANTS, DAY
+from backend.core.storage import storage
+from backend.core.job_queue import job_queue
+from backend.services.lead_service import latest_leads, iter_leads
+from backend.services import export_service
+from backend.services.import_service import import_users, import_clients, ImportTooLarge
+from backend.routes.auth import CreateUserSchema
+from routes.client import ClientCreate
+from backend.services.ollama_service import llm_scheduler
+from backend.services.chat_service import chat_cache
+from backend.services.theme_service import dashboard_cache
+from backend.core.security import auth_cache_stats
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 @router.get("/stats")
-def stats(admin=Depends(get_admin_user)):
-    users = read_users()
-    clients = read_clients()
-    return {
-        "total_users": len(users),
-        "total_clients": len(clients),
+def stats(request: Request, admin=Depends(get_admin_user)):
+    # signups_last_30_days is a rolling window: it changes at midnight UTC even without writes
+    etag = make_etag(
+        "admin.stats", users_version(), clients_version(), storage.modules.version(), datetime.utcnow().date().isoformat()
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_with_etag({
+        "total_users": admin_stats.total("users"),
+        "total_clients": admin_stats.total("clients"),
+        "users_by_role": admin_stats.breakdown("role"),
+        "clients_by_segmento": admin_stats.breakdown("segmento"),
+        "module_adoption": admin_stats.breakdown("module"),
+        "signups_last_30_days": sum(d["count"] for d in admin_stats.daily("signup_day", 30)),
+    }, etag)
+
+@router.get("/stats/timeseries")
+def stats_timeseries(days: int = Query(30, ge=1, le=365), admin=Depends(get_admin_user)):
+    """Daily series, oldest first: signups/clients from admin_stats, leads/conversions/chats from the KPI buckets."""
+    series = {
+        "signups": admin_stats.daily("signup_day", days),
+        "clients": admin_stats.daily("client_day", days),
     }
+    for metric in ("leads", "conversions", "chats"):
+        series[metric] = [
+            {"day": datetime.utcfromtimestamp(p["ts"]).date().isoformat(), "count": p["count"]}
+            for p in kpis.series(ALL_TENANTS, metric, DAY, days)
+        ]
+    return {"days": days, "series": series}
+
+# ---------------- LISTAGENS ----------------
 
 @router.get("/users")
-def list_users(admin=Depends(get_admin_user)):
-    users = read_users()
-    for u in users:
-        u.pop("password", None)
-    return users
+def list_users(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: str = "created_at",
+    role: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    fields: Optional[str] = None,
+    admin=Depends(get_admin_user),
+):
+    etag = make_etag("admin.users", users_version(), request.url.query)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        page = list_page(
+            user_index.page, limit=limit, cursor=cursor, sort=sort, filters={"role": role},
+            created_from=created_from, created_to=created_to, fields=fields,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return json_with_etag(page, etag)
 
 @router.get("/clients")
-def list_clients(admin=Depends(get_admin_user)):
-    return read_clients()
+def list_clients(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: str = "created_at",
+    segmento: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    fields: Optional[str] = None,
+    admin=Depends(get_admin_user),
+):
+    etag = make_etag("admin.clients", clients_version(), request.url.query)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        page = list_page(
+            list_clients_page, limit=limit, cursor=cursor, sort=sort, filters={"segmento": segmento},
+            created_from=created_from, created_to=created_to, fields=fields,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return json_with_etag(page, etag)
+
+@router.post("/clients/backfill")
+def backfill_clients(admin=Depends(get_admin_user)):
+    """Link users to clients by empresa again (runs in the job queue)."""
+    return {"job_id": schedule_client_backfill(force=True)}
+
+# ---------------- IMPORTAÇÃO ----------------
+
+async def _run_import(importer, schema, request: Request, dry_run: bool):
+    try:
+        return await importer(request.stream(), schema, dry_run=dry_run)
+    except ImportTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@router.post("/import/users")
+async def import_users_jsonl(request: Request, dry_run: bool = False, admin=Depends(get_admin_user)):
+    """JSONL body, one CreateUserSchema per line; all valid rows are written in one transaction."""
+    return await _run_import(import_users, CreateUserSchema, request, dry_run)
+
+@router.post("/import/clients")
+async def import_clients_jsonl(request: Request, dry_run: bool = False, admin=Depends(get_admin_user)):
+    """JSONL body, one ClientCreate per line; all valid rows are written in one transaction."""
+    return await _run_import(import_clients, ClientCreate, request, dry_run)
+
+@router.get("/leads")
+def list_leads(limit: int = Query(50, ge=1, le=500), admin=Depends(get_admin_user)):
+    return latest_leads(limit)
+
+@router.get("/leads/export")
+def export_leads(
+    format: str = Query("csv", pattern="^(csv|jsonl)$"),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="colunas separadas por vírgula"),
+    flatten: Optional[str] = Query(None, pattern="^(join|json|explode)$"),
+    sep: str = "; ",
+    explode: Optional[str] = None,
+    gzip: bool = False,
+    admin=Depends(get_admin_user),
+):
+    """Streams the onboarding log; memory stays flat whatever the history size."""
+    try:
+        start = export_service.parse_bound(since)
+        end = export_service.parse_bound(until, end=True)
+    except ValueError:
+        raise HTTPException(400, "since/until devem estar em formato ISO (AAAA-MM-DD)")
+    if flatten == "explode" and not explode:
+        raise HTTPException(400, "flatten=explode precisa de explode=<campo>")
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    body = export_service.export_records(
+        iter_leads(), fmt=format, fields=columns, since=start, until=end,
+        flatten_mode=flatten, sep=sep, explode=explode, gzip=gzip,
+    )
+    filename = f"leads_{datetime.utcnow():%Y%m%d_%H%M%S}.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson")
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/llm/stats")
+def llm_stats(admin=Depends(get_admin_user)):
+    return llm_scheduler.stats()
+
+@router.get("/auth-cache")
+def auth_cache(admin=Depends(get_admin_user)):
+    return auth_cache_stats()
+
+@router.get("/chat-cache")
+def chat_cache_stats(admin=Depends(get_admin_user)):
+    return chat_cache.stats()
+
+@router.post("/chat-cache/flush")
+def flush_chat_cache(admin=Depends(get_admin_user)):
+    """Call after changing the model or the prompt."""
+    return {"flushed": chat_cache.clear()}
+
+@router.get("/dashboard-cache")
+def dashboard_cache_stats(admin=Depends(get_admin_user)):
+    return dashboard_cache.stats()
+
+# ---------------- JOBS ----------------
+
+@router.get("/jobs/dead")
+def dead_jobs(limit: int = Query(100, ge=1, le=1000), admin=Depends(get_admin_user)):
+    return job_queue.dead_letters(limit)
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str, admin=Depends(get_admin_user)):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job não encontrado")
+    return job
+
+@router.post("/jobs/{job_id}/retry")
+def retry_job(job_id: str, admin=Depends(get_admin_user)):
+    if not job_queue.retry(job_id):
+        raise HTTPException(404, "Job não está na dead-letter")
+    return {"retried": True}
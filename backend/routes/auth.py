@@ -1,12 +1,18 @@
 # backend/routes/auth.py
-from fastapi import APIRouter, HTTPException, Request, status, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, status, Depends
 from pydantic import BaseModel, EmailStr
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
-import os, json, bcrypt, uuid
+import os, uuid
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from jose import jwt, JWTError
+from datetime import datetime
 from typing import Dict
+from backend.core.storage import storage
+from backend.core.user_repository import user_repo
+from backend.core.hashing import hasher
+from backend.core.security import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, decode_access_token, revoke_token
+from backend.core.security_user import token_from_request
+from backend.core.token_store import refresh_tokens
 
 # carregar .env (a partir da raiz do projeto)
 ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
@@ -14,15 +20,9 @@ load_dotenv(dotenv_path=ENV_PATH)
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
-# config
-SECRET_KEY = os.getenv("SECRET_KEY", "change_this_secret")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+# config (JWT settings live in core/security.py)
 ADMIN_API_KEY = (os.getenv("ADMIN_API_KEY") or "").strip()
 
-DATA_FILE = Path(__file__).resolve().parents[2] / "data" / "users.json"
-DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-
 # schemas
 class CreateUserSchema(BaseModel):
     empresa: str
@@ -34,74 +34,36 @@ class LoginSchema(BaseModel):
     email: EmailStr
     password: str
 
+class RefreshSchema(BaseModel):
+    refresh_token: str = ""
+
 # --- helpers ---
 def read_users() -> list:
-    if not DATA_FILE.exists():
-        return []
-    try:
-        return json.loads(DATA_FILE.read_text("utf-8"))
-    except Exception:
-        return []
-
-def write_users(users: list):
-    DATA_FILE.write_text(json.dumps(users, indent=2, ensure_ascii=False), "utf-8")
+    return storage.users.all()
 
 def find_user_by_email(email: str) -> Dict:
-    users = read_users()
-    for u in users:
-        if u.get("email") == email:
-            return u
-    return None
-
-def normalize_old_user(u: dict) -> dict:
-    """
-    If old users.json contains 'senha' and no 'id' - convert shape to new format.
-    This runs on-demand when reading users to keep compatibility.
-    """
-    if "id" not in u:
-        new = {
-            "id": u.get("email", str(uuid.uuid4())),
-            "empresa": u.get("empresa") or u.get("company") or "",
-            "email": u.get("email"),
-            "password": u.get("senha") if u.get("senha") else u.get("password"),
-            "role": u.get("role", "user"),
-            "name": u.get("name", "")
-        }
-        # ensure bcrypt hash format (if existing senha already hashed with bcrypt it's fine)
-        return new
-    return u
-
-def load_normalized_users() -> list:
-    users = read_users()
-    normalized = [normalize_old_user(u) for u in users]
-    # if shape changed, persist back (safe migration)
-    # but only write back if any user lacked 'id'
-    if any("id" not in u for u in users):
-        write_users(normalized)
-    return normalized
+    return user_repo.get_by_email(email)
 
+# sync variants for sync callers; async routes await hasher.hash / hasher.verify directly
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return hasher.hash_blocking(password)
 
 def verify_password(password: str, hashed: str) -> bool:
-    try:
-        return bcrypt.checkpw(password.encode(), hashed.encode())
-    except Exception:
-        return False
-
-def create_access_token(data: dict, expires_delta: int = ACCESS_TOKEN_EXPIRE_MINUTES):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=expires_delta)
-    to_encode.update({"exp": expire})
-    token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return token
+    return hasher.verify_blocking(password, hashed)
 
-def decode_access_token(token: str) -> dict:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        raise
+def issue_session(response: Response, user: Dict, refresh_token: str = "") -> Dict:
+    """Short-lived access token + refresh token, returned in the body and as HttpOnly cookies."""
+    token_payload = {"sub": user["id"], "email": user["email"], "role": user.get("role", "client")}
+    access_token = create_access_token(token_payload)
+    refresh_token = refresh_token or refresh_tokens.issue(user["id"])
+    response.set_cookie("access_token", access_token, max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60, httponly=True, samesite="lax")
+    response.set_cookie("refresh_token", refresh_token, max_age=int(refresh_tokens.ttl), httponly=True, samesite="lax", path="/api/auth")
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
 
 # ------------------ create-user (protected by admin key) ------------------
 @router.post("/create-user")
@@ -114,12 +76,10 @@ async def create_user(request: Request):
     schema = CreateUserSchema(**body)
     email = schema.email.lower().strip()
 
-    users = load_normalized_users()
-
     if find_user_by_email(email):
         raise HTTPException(status_code=409, detail="Email já registrado.")
 
-    hashed = hash_password(schema.password)
+    hashed = await hasher.hash(schema.password)
     new_user = {
         "id": str(uuid.uuid4()),
         "empresa": schema.empresa,
@@ -129,40 +89,42 @@ async def create_user(request: Request):
         "name": schema.name,
         "created_at": datetime.utcnow().isoformat()
     }
-    users.append(new_user)
-    write_users(users)
+    with storage.transaction():
+        if storage.users.find_one("email", email):
+            raise HTTPException(status_code=409, detail="Email já registrado.")
+        storage.users.upsert(new_user)
     # you might want to send credentials by email here via email_service
     return {"success": True, "user": {"id": new_user["id"], "email": new_user["email"], "empresa": new_user["empresa"]}}
 
 # ------------------ signin (returns JWT) ------------------
 @router.post("/signin")
-async def signin(data: LoginSchema):
-    users = load_normalized_users()
-    email = data.email.lower().strip()
-    user = next((u for u in users if u.get("email") == email), None)
+async def signin(data: LoginSchema, response: Response):
+    user = user_repo.get_by_email(data.email)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciais inválidas")
 
-    if not verify_password(data.password, user.get("password", "")):
+    if not await hasher.verify(data.password, user.get("password", "")):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciais inválidas")
 
-    token_payload = {"sub": user["id"], "email": user["email"], "role": user.get("role", "client")}
-    access_token = create_access_token(token_payload)
+    if hasher.needs_rehash(user.get("password", "")):
+        # BCRYPT_ROUNDS changed since this hash was made: upgrade it while we have the plain password
+        hashed = await hasher.hash(data.password)
+        await run_in_threadpool(storage.users.update, user["id"], {"password": hashed})
+
     safe_user = {k: v for k, v in user.items() if k != "password"}
-    return {"access_token": access_token, "token_type": "bearer", "user": safe_user}
+    return {**issue_session(response, user), "user": safe_user}
 
 # ------------------ signup (public, optional) ------------------
 @router.post("/signup")
-async def signup(body: CreateUserSchema):
+async def signup(body: CreateUserSchema, response: Response):
     # optional: allow public signup - here we enforce admin-only creation by default
     if not ADMIN_API_KEY:
         # if ADMIN_API_KEY not set, allow signup (dev only). In production set ADMIN_API_KEY.
         pass
     email = body.email.lower().strip()
-    users = load_normalized_users()
     if find_user_by_email(email):
         raise HTTPException(status_code=400, detail="Usuário já existe")
-    hashed = hash_password(body.password)
+    hashed = await hasher.hash(body.password)
     new_user = {
         "id": str(uuid.uuid4()),
         "empresa": body.empresa,
@@ -172,12 +134,12 @@ async def signup(body: CreateUserSchema):
         "name": body.name,
         "created_at": datetime.utcnow().isoformat()
     }
-    users.append(new_user)
-    write_users(users)
-    token_payload = {"sub": new_user["id"], "email": new_user["email"], "role": new_user["role"]}
-    access_token = create_access_token(token_payload)
+    with storage.transaction():
+        if storage.users.find_one("email", email):
+            raise HTTPException(status_code=400, detail="Usuário já existe")
+        storage.users.upsert(new_user)
     safe_user = {k: v for k, v in new_user.items() if k != "password"}
-    return {"access_token": access_token, "token_type": "bearer", "user": safe_user}
+    return {**issue_session(response, new_user), "user": safe_user}
 
 # ------------------ /me - validate token and return user ------------------
 class TokenSchema(BaseModel):
@@ -189,14 +151,51 @@ async def me(payload: TokenSchema):
         data = decode_access_token(payload.token)
     except Exception:
         raise HTTPException(status_code=401, detail="Token inválido")
-    user_id = data.get("sub")
-    users = load_normalized_users()
-    user = next((u for u in users if u.get("id") == user_id), None)
+    user = user_repo.get_by_id(data.get("sub"))
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     safe = {k: v for k, v in user.items() if k != "password"}
     return {"user": safe}
 
+# ------------------ refresh - rotate the refresh token ------------------
+async def _refresh_token_from(request: Request) -> str:
+    token = request.cookies.get("refresh_token", "")
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            token = RefreshSchema(**(await request.json() or {})).refresh_token or token
+        except Exception:
+            pass
+    return token
+
+@router.post("/refresh")
+async def refresh(request: Request, response: Response):
+    rotated = refresh_tokens.rotate(await _refresh_token_from(request))
+    if rotated is None:
+        raise HTTPException(status_code=401, detail="Refresh token inválido ou expirado")
+    entry, new_refresh = rotated
+    user = user_repo.get_by_id(entry["user_id"])
+    if not user:
+        refresh_tokens.revoke(new_refresh)
+        raise HTTPException(status_code=401, detail="Usuário não encontrado")
+    return issue_session(response, user, refresh_token=new_refresh)
+
+# ------------------ logout - revoke access + refresh tokens ------------------
+@router.post("/logout")
+async def logout(request: Request, response: Response):
+    access_token = token_from_request(request)
+    if access_token:
+        try:
+            revoke_token(access_token)
+        except Exception:
+            # expired or already revoked: nothing left to revoke
+            pass
+    refresh_token = await _refresh_token_from(request)
+    if refresh_token:
+        refresh_tokens.revoke(refresh_token)
+    response.delete_cookie("access_token")
+    response.delete_cookie("refresh_token", path="/api/auth")
+    return {"success": True}
+
 # simple ping
 @router.get("/ping")
 def ping():
@@ -1,12 +1,16 @@
 # backend/routes/client.py
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi import Depends
 from pydantic import BaseModel, EmailStr
 
 from core.security_user import get_admin_user
 from services.client_service import (
-    create_client, get_client, read_clients, update_client, delete_client
+    create_client, get_client, update_client, delete_client
 )
+from backend.core.collection_index import list_page
+from services.client_service import list_clients_page, clients_version
+from backend.core.etag import make_etag, etag_matches, not_modified, json_with_etag
 
 router = APIRouter(prefix="/api/clients", tags=["clients"])
 
@@ -23,8 +27,28 @@ def create_cl(payload: ClientCreate, admin=Depends(get_admin_user)):
     return create_client(payload.dict())
 
 @router.get("/")
-def list_clients(admin=Depends(get_admin_user)):
-    return read_clients()
+def list_clients(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: str = "created_at",
+    segmento: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    fields: Optional[str] = None,
+    admin=Depends(get_admin_user),
+):
+    etag = make_etag("clients.list", clients_version(), request.url.query)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        page = list_page(
+            list_clients_page, limit=limit, cursor=cursor, sort=sort, filters={"segmento": segmento},
+            created_from=created_from, created_to=created_to, fields=fields,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return json_with_etag(page, etag)
 
 @router.get("/{client_id}")
 def get_client_route(client_id: str, admin=Depends(get_admin_user)):
@@ -1,36 +1,65 @@
 # backend/routes/dashboard.py
+import os
+from pathlib import Path
 from fastapi import APIRouter, Request
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from core.utils import read_json
-from services.client_service import get_client_by_id
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from core.security import decode_access_token
+from fastapi.responses import HTMLResponse, RedirectResponse
+from jose import JWTError
+from backend.core.security import decode_access_token
+from backend.core.security_user import token_from_request
+from backend.core.user_repository import user_repo
+from backend.core.assets import assets, asset_url
+from backend.core.etag import make_etag, etag_matches, not_modified, CACHE_CONTROL
+from backend.services.client_service import get_client, client_version, resolve_client_id
+from backend.services.image_service import variant_url
+from backend.services.theme_service import dashboard_cache, theme_css_url
+
+TEMPLATES_DIR = Path(__file__).resolve().parents[1] / "templates"
+TEMPLATE = "dashboard_template.html"
 
 router = APIRouter()
-templates = Jinja2Templates(directory="backend/templates")
-security = HTTPBearer()
+templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+templates.env.globals["asset"] = asset_url
+
+def _current_user(request: Request):
+    token = token_from_request(request)
+    if not token:
+        return None
+    try:
+        claims = decode_access_token(token)
+    except JWTError:
+        return None
+    return user_repo.get_by_id(claims.get("sub"))
 
-def get_user_from_token(creds: HTTPAuthorizationCredentials):
-    token = creds.credentials
-    data = decode_access_token(token)
-    return data
+def _render(client_id: str) -> str:
+    client = (get_client(client_id) if client_id else None) or {}
+    theme = client.get("tema") or {}
+    return templates.get_template(TEMPLATE).render(
+        client=client,
+        theme=theme,
+        theme_css=theme_css_url(theme),
+        logo=variant_url(theme.get("logo"), 64),
+    )
 
 @router.get("/dashboard", response_class=HTMLResponse)
-def dashboard(request: Request, creds: HTTPAuthorizationCredentials = None):
+def dashboard(request: Request):
     """
-    Serve a dynamic dashboard page - front-end will call API for data.
-    If token provided in Authorization, it uses that to render user-specific theme.
+    Dashboard page themed for the user's client (cookie or bearer token).
+    The page only changes with the client's tema, so it is rendered once per
+    (client version, template mtime, asset build) and then served from memory.
     """
-    theme = {}
-    client_data = {}
-    if creds:
-        try:
-            data = get_user_from_token(creds)
-            user_id = data.get("sub")
-            # If you have mapping user->client, resolve it. For simplicity, assume user_id == client_id sometimes
-            client_data = get_client_by_id(user_id) or {}
-            theme = client_data.get("tema", {})
-        except Exception:
-            pass
-    return templates.TemplateResponse("dashboard_template.html", {"request": request, "theme": theme, "client": client_data})
+    user = _current_user(request)
+    if not user:
+        return RedirectResponse("/login")
+
+    client_id = resolve_client_id(user) or ""
+    signature = (client_version(client_id) if client_id else 0, os.stat(TEMPLATES_DIR / TEMPLATE).st_mtime_ns, assets.signature())
+    etag = make_etag("dashboard", client_id, *signature)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    html = dashboard_cache.get(client_id, signature)
+    if html is None:
+        html = _render(client_id)
+        dashboard_cache.set(client_id, signature, html)
+    return HTMLResponse(html, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -1,35 +1,39 @@
 # backend/routes/dashboard_data.py
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request
 from core.security_user import get_current_user, get_admin_user
-from services.client_service import get_client, read_clients
-from services.module_service import get_client_modules, list_available_modules
+from services.client_service import get_client, client_version, first_client_id, resolve_client_id
+from services.module_service import (
+    get_client_modules, list_available_modules, available_modules_version, client_modules_version,
+)
+from services.account_service import user_version
+from backend.services.kpi_service import dashboard_kpis, kpi_version
+from backend.services.image_service import image_variants
+from backend.core.etag import make_etag, etag_matches, not_modified, json_with_etag
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
-def _resolve_client_id_from_user(user: Dict):
-    if user.get("client_id"):
-        return user.get("client_id")
-    empresa = (user.get("empresa") or "").strip().lower()
-    if not empresa:
-        return None
-    for c in read_clients():
-        if (c.get("nome") or "").strip().lower() == empresa or (c.get("email") or "").strip().lower() == empresa:
-            return c.get("id")
-    return None
-
 @router.get("/data")
-def dashboard_data(user=Depends(get_current_user)):
-    client_id = _resolve_client_id_from_user(user)
+def dashboard_data(request: Request, user=Depends(get_current_user)):
+    client_id = resolve_client_id(user)
     if not client_id:
         if user.get("role") == "admin":
-            clients = read_clients()
-            if not clients:
+            client_id = first_client_id()
+            if not client_id:
                 raise HTTPException(status_code=404, detail="Nenhum cliente cadastrado")
-            client_id = clients[0].get("id")
         else:
             raise HTTPException(status_code=404, detail="Cliente não encontrado para este usuário")
 
+    # every input of the payload is versioned: answer polls with 304 before loading anything
+    etag = make_etag(
+        "dashboard.data", user["id"], user_version(user["id"]), client_id, client_version(client_id),
+        client_modules_version(client_id), available_modules_version(),
+        # rolling windows move with the clock: at most one minute stale
+        kpi_version(client_id), int(time.time() // 60),
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     client = get_client(client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
@@ -37,24 +41,21 @@ def dashboard_data(user=Depends(get_current_user)):
     modules_cfg = get_client_modules(client_id)
     available = list_available_modules()
 
-    kpis = {
-        "leads_last_7_days": 0,
-        "conversions_last_7_days": 0,
-        "open_chats": 0
-    }
+    kpis = dashboard_kpis(client_id)
 
-    return {
+    return json_with_etag({
         "client": {
             "id": client.get("id"),
             "nome": client.get("nome"),
             "tema": client.get("tema", {}),
             "logo": client.get("tema", {}).get("logo"),
+            "logo_variants": image_variants(client.get("tema", {}).get("logo")),
         },
         "modules": modules_cfg,
         "available_modules": available,
         "user": {k:v for k,v in user.items() if k != "password"},
         "kpis": kpis
-    }
+    }, etag)
 
 @router.get("/client/{client_id}")
 def dashboard_data_admin(client_id: str, admin=Depends(get_admin_user)):
@@ -0,0 +1,27 @@
+# backend/routes/images.py
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+from backend.core.file_manager import blob_path, is_blob
+from backend.core.static_files import IMMUTABLE_CACHE_CONTROL
+from backend.services.image_service import pick_variant
+
+router = APIRouter(prefix="/api/images", tags=["images"])
+
+MEDIA_TYPES = {"webp": "image/webp", "png": "image/png", "jpg": "image/jpeg"}
+
+@router.get("/{blob}")
+def get_image(blob: str, request: Request, w: int = Query(128, ge=1, le=4096)):
+    """
+    Best variant of an uploaded image for a `w`-pixel slot: WebP when the
+    browser accepts it, PNG/JPEG otherwise. Falls back to the original while
+    the variants are still being generated.
+    """
+    if not is_blob(blob) or not blob_path(blob).exists():
+        raise HTTPException(status_code=404, detail="Imagem não encontrada")
+    webp = "image/webp" in request.headers.get("accept", "")
+    picked = pick_variant(blob, w, webp=webp)
+    if picked is None:
+        # variants may show up later, so only a short cache here
+        return FileResponse(blob_path(blob), headers={"Cache-Control": "public, max-age=60", "Vary": "Accept"})
+    path, fmt = picked
+    return FileResponse(path, media_type=MEDIA_TYPES[fmt], headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept"})
@@ -0,0 +1,54 @@
+# backend/routes/leads.py
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel
+from core.security_user import get_admin_user
+from backend.services.lead_service import get_lead, get_leads, latest_leads
+from backend.services import pdf_service
+from backend.core.etag import CACHE_CONTROL, etag_matches, not_modified
+
+router = APIRouter(prefix="/api/leads", tags=["leads"])
+
+PDF_BATCH_MAX = 1000
+
+class PdfBatchSchema(BaseModel):
+    ids: List[str] = []
+    limit: int = 0          # sem ids: os N leads mais recentes
+    format: str = "zip"     # zip | pdf
+
+@router.get("/{lead_id}/pdf")
+def lead_pdf(lead_id: str, request: Request, admin=Depends(get_admin_user)):
+    lead = get_lead(lead_id)
+    if not lead:
+        raise HTTPException(status_code=404, detail="Lead não encontrado")
+    etag = f'"{pdf_service.pdf_digest(lead)}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    _, path = pdf_service.render_to_cache(lead)
+    return FileResponse(path, media_type="application/pdf", filename=f"lead_{lead_id[:8]}.pdf", headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+@router.post("/pdf/batch")
+def leads_pdf_batch(body: PdfBatchSchema, admin=Depends(get_admin_user)):
+    if body.ids:
+        leads = get_leads(body.ids[:PDF_BATCH_MAX])
+    else:
+        leads = latest_leads(min(body.limit or 100, PDF_BATCH_MAX))
+    if not leads:
+        raise HTTPException(status_code=404, detail="Nenhum lead encontrado")
+
+    if body.format == "pdf":
+        if pdf_service.PdfWriter is None:
+            raise HTTPException(status_code=501, detail="pypdf não instalado; use format=zip")
+        return StreamingResponse(
+            pdf_service.merged_pdf(leads),
+            media_type="application/pdf",
+            headers={"Content-Disposition": 'attachment; filename="leads.pdf"'},
+        )
+    if body.format != "zip":
+        raise HTTPException(status_code=400, detail="format deve ser zip ou pdf")
+    return StreamingResponse(
+        pdf_service.stream_zip(leads),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="leads.zip"'},
+    )
@@ -1,6 +1,7 @@
 # backend/routes/modules.py
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Dict, List
+from pydantic import BaseModel
 from core.security_user import get_current_user, get_admin_user
 from services.module_service import (
     list_available_modules,
@@ -8,32 +9,37 @@ from services.module_service import (
     set_client_modules,
     enable_module_for_client,
     disable_module_for_client,
+    available_modules_version,
+    client_modules_version,
+    update_modules_batch,
 )
-from services.client_service import read_clients, get_client
+from backend.core.etag import make_etag, etag_matches, not_modified, json_with_etag
+from services.client_service import get_client, resolve_client_id
 
 router = APIRouter(prefix="/api/modules", tags=["modules"])
 
-def _resolve_client_id_from_user(user: Dict):
-    if user.get("client_id"):
-        return user.get("client_id")
-    empresa = (user.get("empresa") or "").strip().lower()
-    if not empresa:
-        return None
-    for c in read_clients():
-        if (c.get("nome") or "").strip().lower() == empresa or (c.get("email") or "").strip().lower() == empresa:
-            return c.get("id")
-    return None
+class ModulesBatchSchema(BaseModel):
+    clients: List[str] = []
+    all_clients: bool = False   # rollout para todos os clientes
+    enable: List[str] = []
+    disable: List[str] = []
 
 @router.get("/available")
-def available():
-    return {"available": list_available_modules()}
+def available(request: Request):
+    etag = make_etag("modules.available", available_modules_version())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_with_etag({"available": list_available_modules()}, etag)
 
 @router.get("/me")
-def client_modules(user=Depends(get_current_user)):
-    client_id = _resolve_client_id_from_user(user)
+def client_modules(request: Request, user=Depends(get_current_user)):
+    client_id = resolve_client_id(user)
     if not client_id:
         raise HTTPException(status_code=404, detail="Cliente não encontrado para este usuário")
-    return {"client_id": client_id, "modules": get_client_modules(client_id)}
+    etag = make_etag("modules.me", client_id, client_modules_version(client_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_with_etag({"client_id": client_id, "modules": get_client_modules(client_id)}, etag)
 
 @router.get("/client/{client_id}")
 def client_modules_admin(client_id: str, admin=Depends(get_admin_user)):
@@ -50,6 +56,17 @@ def set_modules(client_id: str, payload: Dict, admin=Depends(get_admin_user)):
     cfg = set_client_modules(client_id, enabled)
     return {"client_id": client_id, "modules": cfg}
 
+@router.post("/batch")
+def modules_batch(payload: ModulesBatchSchema, admin=Depends(get_admin_user)):
+    available = {m["key"] for m in list_available_modules()}
+    unknown = sorted(set(payload.enable + payload.disable) - available)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Módulos desconhecidos: {', '.join(unknown)}")
+    if not payload.all_clients and not payload.clients:
+        raise HTTPException(status_code=400, detail="Informe clients ou all_clients")
+    result = update_modules_batch(None if payload.all_clients else payload.clients, payload.enable, payload.disable)
+    return {"updated": len(result), "modules": result}
+
 @router.post("/client/{client_id}/enable/{module_key}")
 def enable_module(client_id: str, module_key: str, admin=Depends(get_admin_user)):
     cfg = enable_module_for_client(client_id, module_key)
@@ -1,33 +1,20 @@
 # backend/services/account_service.py
-from pathlib import Path
-import json
-from core.security_user import read_users
+from backend.core.storage import storage
 from backend.routes.auth import hash_password
+from backend.core.token_store import refresh_tokens
 
-DATA_FILE = Path(__file__).resolve().parents[2] / "data" / "users.json"
+def users_version() -> int:
+    return storage.users.version()
 
-def write_users(users):
-    DATA_FILE.write_text(json.dumps(users, indent=2, ensure_ascii=False), "utf-8")
+def user_version(user_id: str) -> int:
+    return storage.users.record_version(user_id)
 
 def update_user(user_id: str, updates: dict):
-    users = read_users()
-    updated = None
-
-    for idx, u in enumerate(users):
-        if u.get("id") == user_id:
-            users[idx].update(updates)
-            updated = users[idx]
-
-    if updated:
-        write_users(users)
-
-    return updated
+    return storage.users.update(user_id, updates)
 
 def change_user_password(user_id: str, new_password: str):
-    users = read_users()
-    for idx, u in enumerate(users):
-        if u.get("id") == user_id:
-            users[idx]["password"] = hash_password(new_password)
-            write_users(users)
-            return True
-    return False
+    changed = storage.users.update(user_id, {"password": hash_password(new_password)}) is not None
+    if changed:
+        # other sessions must log in again with the new password
+        refresh_tokens.revoke_user(user_id)
+    return changed
@@ -1,44 +1,32 @@
-import json
-from pathlib import Path
+import uuid
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 from jose import jwt
-
-BASE_DIR = Path(__file__).resolve().parent.parent.parent
-USERS_FILE = BASE_DIR / "data" / "users.json"
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from backend.core.storage import storage
+from backend.core.hashing import hasher
 
 # JWT config (será lido do env no router/main)
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return hasher.verify_blocking(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hasher.hash_blocking(password)
 
 def load_users():
-    if not USERS_FILE.exists():
-        return []
-    return json.loads(USERS_FILE.read_text("utf-8"))
+    return storage.users.all()
 
 def save_users(users):
-    USERS_FILE.write_text(json.dumps(users, indent=2, ensure_ascii=False), "utf-8")
+    storage.users.upsert_many(users)
 
 def find_user_by_email(email: str):
-    users = load_users()
-    for u in users:
-        if u.get("email") == email:
-            return u
-    return None
+    return storage.users.find_one("email", email)
 
 def create_user(empresa: str, email: str, password: str, role: str = "user"):
-    users = load_users()
-    if find_user_by_email(email) is not None:
-        raise ValueError("Email já cadastrado")
     hashed = get_password_hash(password)
-    user = {"empresa": empresa, "email": email, "senha": hashed, "role": role}
-    users.append(user)
-    save_users(users)
+    user = {"id": str(uuid.uuid4()), "empresa": empresa, "email": email, "password": hashed, "role": role}
+    with storage.transaction():
+        if find_user_by_email(email) is not None:
+            raise ValueError("Email já cadastrado")
+        storage.users.upsert(user)
     return user
 
 def create_access_token(data: dict, secret_key: str, algorithm: str, expires_delta: timedelta | None = None):
@@ -0,0 +1,116 @@
+# backend/services/chat_service.py
+import hashlib
+import json
+import math
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+from backend.core.lru_cache import LRUCache
+
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "2000"))
+CHAT_CACHE_MAX_BYTES = int(os.getenv("CHAT_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "3600"))
+# how many trailing history turns take part in the cache key
+CHAT_CACHE_HISTORY_WINDOW = int(os.getenv("CHAT_CACHE_HISTORY_WINDOW", "2"))
+
+# server-side conversations
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "10000"))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+CHAT_SYSTEM_PROMPT = os.getenv(
+    "CHAT_SYSTEM_PROMPT",
+    "Você é o assistente comercial da GhostAI. Responda em português, de forma curta, simpática e objetiva, "
+    "e convide o visitante a iniciar o diagnóstico quando fizer sentido.",
+)
+
+chat_cache = LRUCache(max_entries=CHAT_CACHE_MAX_ENTRIES, max_bytes=CHAT_CACHE_MAX_BYTES, ttl=CHAT_CACHE_TTL)
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split()).strip(" .!?")
+
+def chat_cache_key(model: str, history: List[Dict], message: str) -> str:
+    """Digest of (model, trailing history window, message), insensitive to case and spacing."""
+    window = history[-CHAT_CACHE_HISTORY_WINDOW:] if CHAT_CACHE_HISTORY_WINDOW else []
+    parts = {
+        "model": model,
+        "history": [[m.get("role"), _normalize(m.get("content", ""))] for m in window],
+        "message": _normalize(message),
+    }
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+# ---------------- CONVERSAS ----------------
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting Portuguese/English text
+    return max(1, math.ceil(len(text or "") / 4))
+
+class ConversationStore:
+    """
+    In-memory conversations keyed by id, with sliding TTL eviction (every turn
+    refreshes the entry) and a cap on how many are kept.
+
+    Only the most recent turns that fit in `token_budget` are kept and sent to
+    the model, after a pinned system prompt, so per-turn cost stays flat
+    however long the conversation goes.
+    """
+
+    def __init__(
+        self,
+        ttl: float = CHAT_SESSION_TTL,
+        max_sessions: int = CHAT_MAX_SESSIONS,
+        token_budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+        system_prompt: str = CHAT_SYSTEM_PROMPT,
+    ):
+        self.token_budget = token_budget
+        self.system_prompt = system_prompt
+        self._sessions = LRUCache(max_entries=max_sessions, max_bytes=256 * 1024 * 1024, ttl=ttl)
+
+    def _fit(self, turns: List[Dict], reserved: int = 0) -> List[Dict]:
+        budget = self.token_budget - reserved
+        kept = []
+        for turn in reversed(turns):
+            cost = estimate_tokens(turn.get("content", ""))
+            if cost > budget:
+                break
+            kept.append(turn)
+            budget -= cost
+        return list(reversed(kept))
+
+    def _save(self, conv: Dict):
+        size = sum(len(t.get("content", "")) for t in conv["turns"]) + 256
+        self._sessions.set(conv["id"], conv, size=size)
+
+    def get(self, conversation_id: Optional[str]) -> Optional[Dict]:
+        return self._sessions.get(conversation_id) if conversation_id else None
+
+    def get_or_create(self, conversation_id: Optional[str], tenant: str = "", seed_history: Optional[List[Dict]] = None) -> Dict:
+        conv = self.get(conversation_id)
+        if conv is None:
+            turns = [
+                {"role": t.get("role"), "content": t.get("content", "")}
+                for t in (seed_history or [])
+                if t.get("role") in ("user", "assistant")
+            ]
+            conv = {"id": str(uuid.uuid4()), "tenant": tenant, "created_at": time.time(), "turns": self._fit(turns)}
+            self._save(conv)
+        return conv
+
+    def messages_for(self, conv: Dict, message: str) -> List[Dict]:
+        """System prompt + the recent turns that fit the budget + the new message."""
+        reserved = estimate_tokens(message) + estimate_tokens(self.system_prompt)
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        return messages + self._fit(conv["turns"], reserved) + [{"role": "user", "content": message}]
+
+    def append(self, conv: Dict, message: str, reply: str):
+        turns = conv["turns"] + [{"role": "user", "content": message}]
+        if reply:
+            turns.append({"role": "assistant", "content": reply})
+        # older turns would never be sent again, so don't keep them
+        conv["turns"] = self._fit(turns)
+        self._save(conv)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+conversations = ConversationStore()
@@ -1,26 +1,87 @@
 # backend/services/client_service.py
-from pathlib import Path
-import json
+import logging
 import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from backend.core.storage import storage, normalize_key
+from backend.core.collection_index import CollectionIndex
+from backend.core.job_queue import job_queue
+from backend.services.image_service import schedule_variants
+from backend.services.theme_service import dashboard_cache
 
-CLIENTS_FILE = Path(__file__).resolve().parents[2] / "data" / "clients.json"
-CLIENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+logger = logging.getLogger("ghostai")
+
+client_index = CollectionIndex(storage.clients, sort_fields=("created_at", "nome", "email", "segmento"), filter_fields=("segmento",))
 
 def read_clients():
-    if CLIENTS_FILE.exists():
-        try:
-            return json.loads(CLIENTS_FILE.read_text("utf-8"))
-        except:
-            return []
-    return []
+    return storage.clients.all()
 
-def write_clients(data):
-    CLIENTS_FILE.write_text(json.dumps(data, indent=2, ensure_ascii=False), "utf-8")
+def list_clients_page(**query):
+    return client_index.page(**query)
 
-def create_client(payload: dict):
-    clients = read_clients()
+def clients_version() -> int:
+    return storage.clients.version()
+
+def client_version(client_id: str) -> int:
+    return storage.clients.record_version(client_id)
+
+# ---------------- USUÁRIO → CLIENTE ----------------
+
+def resolve_client_id(user: Dict) -> Optional[str]:
+    """
+    Tenant of a user: its `client_id` or, for users created before that field
+    existed, the client whose nome/email matches the user's empresa
+    (client_lookup index, one indexed read).
+    """
+    if user.get("client_id"):
+        return user.get("client_id")
+    return storage.lookup_client_id(user.get("empresa"))
+
+def first_client_id() -> Optional[str]:
+    client = storage.clients.first()
+    return client.get("id") if client else None
 
-    new_client = {
+@job_queue.handler("users.backfill_client_id")
+def backfill_user_client_ids(payload: Dict = None) -> Dict:
+    """
+    Write client_id onto users that only match a client by empresa. With
+    `keys` in the payload only users whose empresa normalizes to one of them
+    are looked at (indexed); without, every user is (startup, admin endpoint).
+    """
+    keys = (payload or {}).get("keys")
+    with storage.transaction():
+        pending = []
+        for user in storage.users.all() if keys is None else storage.users_with_empresa(keys):
+            if user.get("client_id"):
+                continue
+            client_id = storage.lookup_client_id(user.get("empresa"))
+            if client_id:
+                pending.append({**user, "client_id": client_id})
+        if pending:
+            storage.users.upsert_many(pending)
+        if keys is None:
+            storage.set_meta("client_backfill", "1")
+    if pending:
+        logger.info("client_id preenchido em %s usuários", len(pending))
+    return {"updated": len(pending)}
+
+def schedule_client_backfill(force: bool = False, keys: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Full backfill (once per database unless `force`), or, given the nome/email
+    keys a client write touched, only the users those keys can link.
+    """
+    if keys is not None:
+        keys = sorted({normalize_key(k) for k in keys} - {""})
+        return job_queue.enqueue("users.backfill_client_id", {"keys": keys}) if keys else None
+    if not force and storage.get_meta("client_backfill") is not None:
+        return None
+    return job_queue.enqueue("users.backfill_client_id", {})
+
+def _link_keys(*clients: Optional[Dict]) -> List[str]:
+    return [c.get(field) for c in clients if c for field in ("nome", "email")]
+
+def build_client(payload: dict) -> dict:
+    return {
         "id": str(uuid.uuid4()),
         "nome": payload.get("nome"),
         "email": payload.get("email"),
@@ -28,31 +89,37 @@ def create_client(payload: dict):
         "tema": payload.get("tema", {}),
         "permissoes": payload.get("permissoes", {}),
         "configuracoes": payload.get("configuracoes", {}),
-        "created_at": payload.get("created_at"),
+        "created_at": payload.get("created_at") or datetime.utcnow().isoformat(),
     }
 
-    clients.append(new_client)
-    write_clients(clients)
-    return new_client
+def _logo(client: dict) -> Optional[str]:
+    return (client.get("tema") or {}).get("logo")
+
+def create_client(payload: dict):
+    client = storage.clients.upsert(build_client(payload))
+    # users that signed up before their client existed can now be linked
+    schedule_client_backfill(keys=_link_keys(client))
+    schedule_variants(_logo(client))
+    return client
 
 def get_client(client_id: str):
-    return next((c for c in read_clients() if c["id"] == client_id), None)
+    return storage.clients.get(client_id)
 
 def update_client(client_id: str, updates: dict):
-    clients = read_clients()
-    updated = None
-    for i, c in enumerate(clients):
-        if c["id"] == client_id:
-            clients[i].update(updates)
-            updated = clients[i]
-    if updated:
-        write_clients(clients)
-    return updated
+    # never let a payload move the record to another id
+    updates = {k: v for k, v in updates.items() if k != "id"}
+    renamed = "nome" in updates or "email" in updates
+    # the old keys too: users matching them may now resolve to another client
+    previous = storage.clients.get(client_id) if renamed else None
+    client = storage.clients.update(client_id, updates)
+    if client and renamed:
+        schedule_client_backfill(keys=_link_keys(previous, client))
+    if client and "tema" in updates:
+        schedule_variants(_logo(client))
+    if client:
+        dashboard_cache.invalidate(client_id)
+    return client
 
 def delete_client(client_id: str):
-    clients = read_clients()
-    new_list = [c for c in clients if c["id"] != client_id]
-    if len(new_list) == len(clients):
-        return False
-    write_clients(new_list)
-    return True
+    dashboard_cache.invalidate(client_id)
+    return storage.clients.delete(client_id)
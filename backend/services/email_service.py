@@ -0,0 +1,63 @@
+# backend/services/email_service.py
+import os
+import logging
+import smtplib
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from email.mime.application import MIMEApplication
+from pathlib import Path
+from dotenv import load_dotenv
+from backend.core.job_queue import job_queue
+from backend.services.pdf_service import lead_pdf_bytes
+
+# carregar .env
+ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
+load_dotenv(dotenv_path=ENV_PATH)
+
+logger = logging.getLogger("ghostai")
+
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASS = os.getenv("SMTP_PASS")
+ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", SMTP_USER or "")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+def send_email_with_pdf(data: dict):
+    if not SMTP_USER or not SMTP_PASS:
+        logger.warning("Envio de e-mail desativado (credenciais não configuradas).")
+        return
+
+    pdf_bytes = lead_pdf_bytes(data)
+
+    html_body = f"""
+    <!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8"></head><body>
+    <h2>Novo Lead Recebido</h2>
+    <p>Nome: {data.get('nome','-')}</p>
+    <p>Email: {data.get('email','-')}</p>
+    <p>WhatsApp: {data.get('whatsapp','-')}</p>
+    <p>Empresa: {data.get('empresa','-')}</p>
+    </body></html>
+    """
+
+    msg = MIMEMultipart("alternative")
+    msg["From"] = SMTP_USER
+    msg["To"] = ADMIN_EMAIL
+    msg["Subject"] = "Novo Lead - GhostAI"
+    msg.attach(MIMEText(html_body, "html", "utf-8"))
+    pdf_attachment = MIMEApplication(pdf_bytes, _subtype="pdf")
+    pdf_attachment.add_header("Content-Disposition", "attachment", filename="lead_ghostai.pdf")
+    msg.attach(pdf_attachment)
+
+    # errors propagate so the job queue can retry with backoff
+    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT) as server:
+        server.starttls()
+        server.login(SMTP_USER, SMTP_PASS)
+        server.sendmail(SMTP_USER, ADMIN_EMAIL, msg.as_string())
+    logger.info("Email enviado com sucesso para %s", ADMIN_EMAIL)
+
+# ---------------- JOBS ----------------
+
+@job_queue.handler("onboarding.notify")
+def notify_new_lead(data: dict):
+    send_email_with_pdf(data)
@@ -0,0 +1,134 @@
+# backend/services/export_service.py
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+# default CSV columns for onboarding leads (JSONL without `fields` exports whole records)
+LEAD_FIELDS = (
+    "id", "created_at", "nome", "email", "whatsapp", "empresa",
+    "segmento", "volume", "canal", "objetivo", "links", "descricao", "plano",
+)
+FLATTEN_MODES = ("join", "json", "explode")
+ROWS_PER_CHUNK = 200
+
+# ---------------- ETAPAS ----------------
+# each stage takes and returns an iterator, so only one chunk of rows is ever in memory
+
+def parse_bound(value: Optional[str], end: bool = False) -> Optional[datetime]:
+    """ISO date or datetime; a bare date as the upper bound covers that whole day."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.replace(tzinfo=None)
+
+def filter_dates(records: Iterable[Dict], since: Optional[datetime], until: Optional[datetime], field: str = "created_at") -> Iterator[Dict]:
+    if since is None and until is None:
+        yield from records
+        return
+    for record in records:
+        try:
+            ts = datetime.fromisoformat(record.get(field) or "").replace(tzinfo=None)
+        except ValueError:
+            # undated (legacy onboarding.json) records can't match a date range
+            continue
+        if since is not None and ts < since:
+            continue
+        if until is not None and ts >= until:
+            continue
+        yield record
+
+def project(records: Iterable[Dict], fields: Optional[Sequence[str]]) -> Iterator[Dict]:
+    if not fields:
+        yield from records
+        return
+    for record in records:
+        yield {f: record.get(f) for f in fields}
+
+def flatten(records: Iterable[Dict], mode: str = "join", sep: str = "; ", explode: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Make list fields (canal, objetivo...) fit in one CSV cell: "join" joins the
+    items with `sep`, "json" writes them as a JSON array. "explode" emits one
+    row per item of the `explode` field, with the other lists joined.
+    """
+    for record in records:
+        out = {}
+        for key, value in record.items():
+            if isinstance(value, (list, tuple)) and key != explode:
+                out[key] = json.dumps(value, ensure_ascii=False) if mode == "json" else sep.join(map(str, value))
+            elif isinstance(value, dict):
+                out[key] = json.dumps(value, ensure_ascii=False)
+            else:
+                out[key] = value
+        items = record.get(explode) if explode else None
+        if mode == "explode" and explode:
+            if not isinstance(items, (list, tuple)):
+                items = [items] if items not in (None, "") else [None]
+            for item in items or [None]:
+                yield {**out, explode: item}
+        else:
+            if explode and isinstance(items, (list, tuple)):
+                out[explode] = sep.join(map(str, items))
+            yield out
+
+# ---------------- FORMATOS ----------------
+
+def encode_csv(rows: Iterable[Dict], fields: Sequence[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(fields), extrasaction="ignore")
+    # BOM so Excel opens accented text correctly
+    buffer.write("\ufeff")
+    writer.writeheader()
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+def encode_jsonl(rows: Iterable[Dict]) -> Iterator[bytes]:
+    chunk: List[str] = []
+    for row in rows:
+        chunk.append(json.dumps(row, ensure_ascii=False, default=str))
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield ("\n".join(chunk) + "\n").encode("utf-8")
+            chunk = []
+    if chunk:
+        yield ("\n".join(chunk) + "\n").encode("utf-8")
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+# ---------------- PIPELINE ----------------
+
+def export_records(
+    records: Iterable[Dict],
+    fmt: str = "csv",
+    fields: Optional[Sequence[str]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    flatten_mode: Optional[str] = None,
+    sep: str = "; ",
+    explode: Optional[str] = None,
+    gzip: bool = False,
+) -> Iterator[bytes]:
+    rows = project(filter_dates(records, since, until), fields)
+    if fmt == "csv":
+        columns = list(fields or LEAD_FIELDS)
+        chunks = encode_csv(flatten(rows, flatten_mode or "join", sep, explode), columns)
+    elif flatten_mode is None and not explode:
+        # lists are native in JSON: only flattened when asked to
+        chunks = encode_jsonl(rows)
+    else:
+        chunks = encode_jsonl(flatten(rows, flatten_mode or "join", sep, explode))
+    return gzip_stream(chunks) if gzip else chunks
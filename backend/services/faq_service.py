@@ -0,0 +1,144 @@
+# backend/services/faq_service.py
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+FAQ_FILE = Path(__file__).resolve().parents[2] / "data" / "faq.json"
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.45"))
+NGRAM_SIZES = (3, 4)
+
+# ---------------- TEXTO ----------------
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    text = re.sub(r"[^a-z0-9 ]+", " ", text.lower().replace("_", " "))
+    return " ".join(text.split())
+
+def char_ngrams(text: str) -> List[str]:
+    padded = f" {normalize_text(text)} "
+    return [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+
+# ---------------- ÍNDICE ----------------
+
+class FaqIndex:
+    """
+    TF-IDF index over character n-grams of the FAQ entries, held as a dense
+    L2-normalized NumPy matrix (one row per indexed text). A query is scored
+    against every row with a single matrix-vector product.
+
+    faq.json maps a key to either an answer string or
+    {"resposta": "...", "perguntas": ["...", ...]}; the key, the questions and
+    the answer are all indexed and point back to the same entry.
+    The index is rebuilt whenever the file's (mtime, size) changes.
+    """
+
+    def __init__(self, path: Path = FAQ_FILE, threshold: float = FAQ_MATCH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._signature = None
+        self._vocab: Dict[str, int] = {}
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._row_entry: List[int] = []
+        self._entries: List[Tuple[str, str]] = []
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load_entries(self) -> List[Tuple[str, str, List[str]]]:
+        try:
+            raw = json.loads(self.path.read_text("utf-8"))
+        except Exception:
+            return []
+        entries = []
+        for key, value in raw.items():
+            if isinstance(value, dict):
+                answer = value.get("resposta", "")
+                texts = [key] + list(value.get("perguntas", [])) + [answer]
+            else:
+                answer, texts = str(value), [key, str(value)]
+            if answer:
+                entries.append((key, answer, texts))
+        return entries
+
+    def _build(self):
+        entries = self._load_entries()
+        docs, row_entry = [], []
+        for i, (_, _, texts) in enumerate(entries):
+            for text in texts:
+                grams = char_ngrams(text)
+                if grams:
+                    docs.append(grams)
+                    row_entry.append(i)
+
+        vocab: Dict[str, int] = {}
+        for grams in docs:
+            for g in grams:
+                vocab.setdefault(g, len(vocab))
+
+        tf = np.zeros((len(docs), len(vocab)), dtype=np.float32)
+        for row, grams in enumerate(docs):
+            for g in grams:
+                tf[row, vocab[g]] += 1.0
+        df = (tf > 0).sum(axis=0)
+        idf = (np.log((1.0 + len(docs)) / (1.0 + df)) + 1.0).astype(np.float32)
+        matrix = np.log1p(tf) * idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+
+        self._vocab, self._idf, self._matrix = vocab, idf, matrix
+        self._row_entry = row_entry
+        self._entries = [(key, answer) for key, answer, _ in entries]
+
+    def refresh(self):
+        if self._stat_signature() == self._signature:
+            return
+        with self._lock:
+            signature = self._stat_signature()
+            if signature == self._signature:
+                return
+            self._build()
+            self._signature = signature
+
+    def _vectorize(self, text: str) -> Optional[np.ndarray]:
+        vec = np.zeros(len(self._vocab), dtype=np.float32)
+        for g in char_ngrams(text):
+            idx = self._vocab.get(g)
+            if idx is not None:
+                vec[idx] += 1.0
+        vec = np.log1p(vec) * self._idf
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else None
+
+    def search(self, message: str) -> Optional[Dict]:
+        """Best entry for `message` with its cosine score, or None if nothing overlaps."""
+        self.refresh()
+        if not self._row_entry:
+            return None
+        query = self._vectorize(message)
+        if query is None:
+            return None
+        scores = self._matrix @ query
+        best = int(np.argmax(scores))
+        key, answer = self._entries[self._row_entry[best]]
+        score = float(scores[best])
+        return {"key": key, "answer": answer, "score": score if math.isfinite(score) else 0.0}
+
+    def match(self, message: str) -> Optional[Dict]:
+        """Same as search(), but only above the confidence threshold."""
+        hit = self.search(message)
+        return hit if hit and hit["score"] >= self.threshold else None
+
+faq_index = FaqIndex()
@@ -0,0 +1,134 @@
+# backend/services/image_service.py
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from backend.core.file_manager import blob_from_url, blob_path, blob_url
+from backend.core.job_queue import job_queue
+
+try:
+    # optional: without Pillow the originals are served as-is
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger("ghostai")
+
+IMAGE_WIDTHS = tuple(sorted(int(w) for w in os.getenv("IMAGE_WIDTHS", "32,64,128,256,512").split(",") if w.strip()))
+IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+# vector images are already small and scale by themselves
+RASTER_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+FALLBACK_FORMATS = ("png", "jpg")
+
+# ---------------- NOMES ----------------
+# variants sit next to the original blob: <sha256>.w<width>.<webp|png|jpg>
+
+def variant_name(blob: str, width: int, fmt: str) -> str:
+    return f"{blob.split('.', 1)[0]}.w{width}.{fmt}"
+
+def variant_path(blob: str, width: int, fmt: str) -> Path:
+    return blob_path(blob).with_name(variant_name(blob, width, fmt))
+
+def is_raster(blob: str) -> bool:
+    return blob.rsplit(".", 1)[-1].lower() in RASTER_EXTENSIONS
+
+def pick_variant(blob: str, width: int, webp: bool = True) -> Optional[Tuple[Path, str]]:
+    """
+    Smallest generated variant at least `width` wide, as (path, format);
+    None when there is none (not generated yet, or wider than every variant).
+    """
+    candidates = [w for w in IMAGE_WIDTHS if w >= width]
+    formats = ("webp",) + FALLBACK_FORMATS if webp else FALLBACK_FORMATS
+    for w in candidates:
+        for fmt in formats:
+            path = variant_path(blob, w, fmt)
+            if path.exists():
+                return path, fmt
+    return None
+
+def image_variants(url: Optional[str]) -> Dict:
+    """{"webp": {width: url}, "fallback": {width: url}} for the variants already generated."""
+    blob = blob_from_url(url)
+    out = {"webp": {}, "fallback": {}}
+    if not blob:
+        return out
+    base = blob_url(blob).rsplit("/", 1)[0]
+    for w in IMAGE_WIDTHS:
+        if variant_path(blob, w, "webp").exists():
+            out["webp"][w] = f"{base}/{variant_name(blob, w, 'webp')}"
+        for fmt in FALLBACK_FORMATS:
+            if variant_path(blob, w, fmt).exists():
+                out["fallback"][w] = f"{base}/{variant_name(blob, w, fmt)}"
+    return out
+
+def variant_url(url: Optional[str], width: int) -> Optional[str]:
+    """URL that picks the right variant of an uploaded image for a `width`-pixel slot; other URLs unchanged."""
+    blob = blob_from_url(url)
+    return f"/api/images/{blob}?w={width}" if blob and is_raster(blob) else url
+
+# ---------------- GERAÇÃO ----------------
+
+def _has_alpha(img) -> bool:
+    return img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+
+def _save_atomic(img, dest: Path, fmt: str, **options):
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, suffix=f".{fmt}.tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            img.save(out, format=fmt, **options)
+        os.replace(tmp, dest)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+def generate_variants(blob: str) -> Dict:
+    """Resize and recompress one blob into every configured width; existing variants are kept."""
+    source = blob_path(blob)
+    if Image is None or not is_raster(blob) or not source.exists():
+        return {"generated": 0}
+    try:
+        with Image.open(source) as original:
+            img = ImageOps.exif_transpose(original)
+            alpha = _has_alpha(img)
+            img = img.convert("RGBA" if alpha else "RGB")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # not a decodable image: retrying won't help, keep serving the original
+        logger.warning("variantes ignoradas para %s: %s", blob, e)
+        return {"generated": 0, "error": str(e)}
+    fallback = "png" if alpha else "jpg"
+
+    generated = 0
+    # every width below the original, plus the next one up as a recompressed
+    # copy at the original size (never upscaled)
+    widths = [w for w in IMAGE_WIDTHS if w < img.width] + [w for w in IMAGE_WIDTHS if w >= img.width][:1]
+    for w in widths:
+        webp_path, fallback_path = variant_path(blob, w, "webp"), variant_path(blob, w, fallback)
+        if webp_path.exists() and fallback_path.exists():
+            continue
+        if w < img.width:
+            resized = img.resize((w, max(1, round(img.height * w / img.width))), Image.LANCZOS)
+        else:
+            resized = img
+        _save_atomic(resized, webp_path, "WEBP", quality=IMAGE_WEBP_QUALITY, method=4)
+        if fallback == "png":
+            _save_atomic(resized, fallback_path, "PNG", optimize=True)
+        else:
+            _save_atomic(resized, fallback_path, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+        generated += 1
+    return {"generated": generated}
+
+@job_queue.handler("images.variants")
+def build_image_variants(payload: Dict) -> Dict:
+    result = generate_variants(payload["blob"])
+    if result["generated"]:
+        logger.info("%s variantes geradas para %s", result["generated"], payload["blob"])
+    return result
+
+def schedule_variants(url: Optional[str]) -> Optional[str]:
+    """Queue derivative generation for an uploaded image URL (no-op for anything else)."""
+    blob = blob_from_url(url)
+    if not blob or Image is None or not is_raster(blob):
+        return None
+    return job_queue.enqueue("images.variants", {"blob": blob})
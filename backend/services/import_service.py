@@ -0,0 +1,152 @@
+# backend/services/import_service.py
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from backend.core.hashing import hasher, BCRYPT_MAX_PASSWORD_BYTES
+from backend.core.storage import storage
+from backend.core.user_repository import normalize_email
+from backend.services.client_service import build_client, schedule_client_backfill
+from backend.services.image_service import schedule_variants
+
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "5000"))
+
+class ImportTooLarge(Exception):
+    pass
+
+async def iter_jsonl(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """(line number, text) for every non-blank line of a streamed JSONL body."""
+    buffer, line_no = b"", 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            if raw.strip():
+                yield line_no, raw.decode("utf-8", "replace")
+    if buffer.strip():
+        yield line_no + 1, buffer.decode("utf-8", "replace")
+
+def _error_text(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+
+async def _validated_rows(chunks: AsyncIterator[bytes], schema: Type[BaseModel], report: List[Dict]):
+    """Valid rows as (report entry, parsed model); invalid ones only go to the report."""
+    rows = []
+    async for line_no, text in iter_jsonl(chunks):
+        if len(report) >= IMPORT_MAX_ROWS:
+            raise ImportTooLarge(f"máximo de {IMPORT_MAX_ROWS} linhas por importação")
+        entry = {"line": line_no}
+        report.append(entry)
+        try:
+            row = json.loads(text)
+        except ValueError:
+            entry.update(status="invalid", error="JSON inválido")
+            continue
+        if not isinstance(row, dict):
+            entry.update(status="invalid", error="cada linha deve ser um objeto JSON")
+            continue
+        try:
+            model = schema(**row)
+        except ValidationError as e:
+            entry.update(status="invalid", error=_error_text(e))
+            continue
+        entry["email"] = normalize_email(model.email)
+        rows.append((entry, model))
+    return rows
+
+def _summary(report: List[Dict], dry_run: bool) -> Dict:
+    counts = {}
+    for entry in report:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return {"total": len(report), "dry_run": dry_run, **counts, "rows": report}
+
+def _dedupe(rows, repository) -> list:
+    """Drop rows whose email repeats in the batch or already exists (indexed lookups)."""
+    seen, fresh = set(), []
+    for entry, model in rows:
+        email = entry["email"]
+        if email in seen or repository.find_one("email", email):
+            entry.update(status="duplicate", error="email já cadastrado")
+            continue
+        seen.add(email)
+        fresh.append((entry, model))
+    return fresh
+
+def _commit(repository, records, dry_run: bool, link_fields: Tuple[str, ...]):
+    """
+    Write every (entry, record) pair in a single transaction. Emails are
+    checked again inside it, since a signup may have landed while we hashed.
+    `link_fields` are the record fields a user/client match goes through.
+    """
+    if dry_run:
+        for entry, _ in records:
+            entry["status"] = "valid"
+        return
+    with storage.transaction():
+        fresh = [(e, r) for e, r in records if not repository.find_one("email", r["email"])]
+        if fresh:
+            repository.upsert_many([r for _, r in fresh])
+    created = {id(e) for e, _ in fresh}
+    for entry, record in records:
+        if id(entry) in created:
+            entry.update(status="created", id=record["id"])
+        else:
+            entry.update(status="duplicate", error="email já cadastrado")
+    if fresh:
+        # users and clients may now be linkable: only through the new records' keys
+        schedule_client_backfill(keys=[r.get(f) for _, r in fresh for f in link_fields])
+
+# ---------------- USUÁRIOS ----------------
+
+def _hashable(rows) -> list:
+    """Drop rows whose password bcrypt can't take, before they claim their email in the batch."""
+    ok = []
+    for entry, model in rows:
+        if len(model.password.encode()) > BCRYPT_MAX_PASSWORD_BYTES:
+            entry.update(status="invalid", error=f"password: no máximo {BCRYPT_MAX_PASSWORD_BYTES} bytes")
+            continue
+        ok.append((entry, model))
+    return ok
+
+async def import_users(chunks: AsyncIterator[bytes], schema: Type[BaseModel], dry_run: bool = False) -> Dict:
+    report: List[Dict] = []
+    rows = _dedupe(_hashable(await _validated_rows(chunks, schema, report)), storage.users)
+    # one batch across the bulk pool instead of one hash per request slot
+    hashes = [None] * len(rows) if dry_run else await hasher.hash_many([model.password for _, model in rows])
+    hashed_rows = []
+    for (entry, model), hashed in zip(rows, hashes):
+        if isinstance(hashed, Exception):
+            # only this row fails; the report still covers the whole batch
+            entry.update(status="invalid", error=f"password: {hashed}")
+            continue
+        hashed_rows.append(((entry, model), hashed))
+    now = datetime.utcnow().isoformat()
+    users = [
+        (entry, {
+            "id": str(uuid.uuid4()),
+            "empresa": model.empresa,
+            "email": entry["email"],
+            "password": hashed,
+            "role": "client",
+            "name": model.name,
+            "created_at": now,
+        })
+        for (entry, model), hashed in hashed_rows
+    ]
+    _commit(storage.users, users, dry_run, ("empresa",))
+    return _summary(report, dry_run)
+
+# ---------------- CLIENTES ----------------
+
+async def import_clients(chunks: AsyncIterator[bytes], schema: Type[BaseModel], dry_run: bool = False) -> Dict:
+    report: List[Dict] = []
+    rows = _dedupe(await _validated_rows(chunks, schema, report), storage.clients)
+    clients = [(entry, build_client({**model.dict(), "email": entry["email"]})) for entry, model in rows]
+    _commit(storage.clients, clients, dry_run, ("nome", "email"))
+    for entry, client in clients:
+        if entry["status"] == "created":
+            schedule_variants((client.get("tema") or {}).get("logo"))
+    return _summary(report, dry_run)
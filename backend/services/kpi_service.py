@@ -0,0 +1,82 @@
+# backend/services/kpi_service.py
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+from backend.core.kpi_engine import kpis, ALL_TENANTS
+from backend.core.storage import storage
+
+KPI_WINDOW = 7 * 86400
+# a chat counts as open while its server-side conversation would still be alive
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))
+LEAD_METRICS = ("leads", "conversions")
+
+def client_id_for_tenant(tenant: Optional[str]) -> Optional[str]:
+    """Client id behind a tenant hint (client id, company name or email), if any."""
+    if not tenant:
+        return None
+    if storage.clients.record_version(tenant):
+        return tenant
+    return storage.lookup_client_id(tenant)
+
+def _lead_ts(lead: Dict) -> Optional[float]:
+    try:
+        created = datetime.fromisoformat(lead.get("created_at") or "")
+    except ValueError:
+        return None
+    # save_lead writes naive UTC timestamps
+    return (created if created.tzinfo else created.replace(tzinfo=timezone.utc)).timestamp()
+
+def _lead_events(lead: Dict):
+    ts = _lead_ts(lead)
+    if ts is None:
+        # legacy onboarding.json entries carry no date: they can't be placed in a bucket
+        return
+    tenant = lead.get("client_id")
+    yield tenant, "leads", ts, 1
+    if lead.get("plano"):
+        # a lead that picked a plan is a conversion
+        yield tenant, "conversions", ts, 1
+
+# ---------------- ESCRITA ----------------
+
+def record_lead(lead: Dict):
+    kpis.record_many(_lead_events(lead))
+
+def record_chat(tenant: Optional[str]):
+    # an unknown hint (raw Origin host or IP) only counts in the global total:
+    # keeping buckets per hint would grow without bound
+    kpis.record(client_id_for_tenant(tenant) or ALL_TENANTS, "chats")
+
+def rebuild_lead_kpis(leads: Iterable[Dict], batch: int = 1000) -> int:
+    """Recount lead metrics from the onboarding log."""
+    kpis.reset(LEAD_METRICS)
+    events, total = [], 0
+    for lead in leads:
+        events.extend(_lead_events(lead))
+        total += 1
+        if len(events) >= batch:
+            kpis.record_many(events)
+            events = []
+    kpis.record_many(events)
+    storage.set_meta("kpi.leads", str(int(time.time())))
+    return total
+
+def ensure_lead_kpis(leads: Iterable[Dict]) -> int:
+    """Rebuild once per database (first start, or after the buckets were lost)."""
+    if storage.get_meta("kpi.leads") is not None:
+        return 0
+    return rebuild_lead_kpis(leads)
+
+# ---------------- LEITURA ----------------
+
+def dashboard_kpis(client_id: Optional[str] = None) -> Dict:
+    tenant = client_id or ALL_TENANTS
+    return {
+        "leads_last_7_days": kpis.window(tenant, "leads", KPI_WINDOW),
+        "conversions_last_7_days": kpis.window(tenant, "conversions", KPI_WINDOW),
+        "open_chats": kpis.window(tenant, "chats", CHAT_SESSION_TTL),
+    }
+
+def kpi_version(client_id: Optional[str] = None) -> int:
+    return kpis.version(client_id or ALL_TENANTS)
@@ -0,0 +1,65 @@
+# backend/services/lead_service.py
+import json
+import os
+import uuid
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from backend.core.segment_log import SegmentLog
+from backend.services.kpi_service import record_lead, ensure_lead_kpis
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+LEGACY_ONBOARDING_FILE = DATA_DIR / "onboarding.json"
+ONBOARDING_LOG_DIR = DATA_DIR / "onboarding"
+
+ONBOARDING_FSYNC = os.getenv("ONBOARDING_FSYNC", "always")  # always | interval | never
+ONBOARDING_COMPACT_INTERVAL = float(os.getenv("ONBOARDING_COMPACT_INTERVAL", "3600"))
+
+# indexed by id: single-lead reads (PDF, batch export) seek straight to the record
+onboarding_log = SegmentLog(ONBOARDING_LOG_DIR, fsync=ONBOARDING_FSYNC, index_field="id")
+
+def migrate_legacy_onboarding() -> int:
+    """Copy data/onboarding.json into the log once (only while the log is still empty)."""
+    if not onboarding_log.is_empty() or not LEGACY_ONBOARDING_FILE.exists():
+        return 0
+    try:
+        existing = json.loads(LEGACY_ONBOARDING_FILE.read_text("utf-8"))
+    except Exception:
+        return 0
+    for record in existing:
+        onboarding_log.append(record)
+    onboarding_log.flush()
+    return len(existing)
+
+def save_lead(data: Dict) -> Dict:
+    record = dict(data)
+    record.setdefault("id", str(uuid.uuid4()))
+    record.setdefault("created_at", datetime.utcnow().isoformat())
+    saved = onboarding_log.append(record)
+    record_lead(saved)
+    return saved
+
+def iter_leads() -> Iterator[Dict]:
+    return onboarding_log.iter_records()
+
+def latest_leads(limit: int = 50) -> List[Dict]:
+    # bounded deque: memory stays O(limit) however long the history is
+    return list(reversed(deque(iter_leads(), maxlen=limit)))
+
+def get_lead(lead_id: str) -> Optional[Dict]:
+    return onboarding_log.get(lead_id) if lead_id else None
+
+def get_leads(lead_ids: List[str]) -> List[Dict]:
+    """Several leads through the id index, in the order of `lead_ids`."""
+    found = (get_lead(i) for i in dict.fromkeys(lead_ids))
+    return [lead for lead in found if lead]
+
+def start_lead_log():
+    migrate_legacy_onboarding()
+    ensure_lead_kpis(iter_leads())
+    onboarding_log.build_index()
+    onboarding_log.start_compactor(interval=ONBOARDING_COMPACT_INTERVAL)
+
+def stop_lead_log():
+    onboarding_log.close()
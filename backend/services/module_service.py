@@ -1,10 +1,7 @@
 # backend/services/module_service.py
-from pathlib import Path
-import json
-import uuid
-
-MODULES_FILE = Path(__file__).resolve().parents[2] / "data" / "modules.json"
-MODULES_FILE.parent.mkdir(parents=True, exist_ok=True)
+import threading
+from typing import Dict, Iterable, List, Optional
+from backend.core.storage import storage
 
 DEFAULT_AVAILABLE_MODULES = [
     {"key": "whatsapp", "name": "WhatsApp Automations", "description": "Fluxos e envios via WhatsApp"},
@@ -14,45 +11,117 @@ DEFAULT_AVAILABLE_MODULES = [
     {"key": "analytics", "name": "Analytics", "description": "KPIs e relatórios"},
 ]
 
-def _read_file():
-    if not MODULES_FILE.exists():
-        initial = {"available": DEFAULT_AVAILABLE_MODULES, "client_modules": {}}
-        MODULES_FILE.write_text(json.dumps(initial, indent=2, ensure_ascii=False), "utf-8")
-        return initial
-    try:
-        return json.loads(MODULES_FILE.read_text("utf-8"))
-    except Exception:
-        return {"available": DEFAULT_AVAILABLE_MODULES, "client_modules": {}}
+def list_available_modules():
+    catalog = storage.settings.get("modules.available")
+    return catalog["value"] if catalog else DEFAULT_AVAILABLE_MODULES
 
-def _write_file(data):
-    MODULES_FILE.write_text(json.dumps(data, indent=2, ensure_ascii=False), "utf-8")
+def available_modules_version() -> int:
+    return storage.settings.record_version("modules.available")
 
-def list_available_modules():
-    data = _read_file()
-    return data.get("available", DEFAULT_AVAILABLE_MODULES)
+def client_modules_version(client_id: str) -> int:
+    return storage.modules.record_version(client_id)
+
+# ---------------- ENTITLEMENTS ----------------
+
+class EntitlementIndex:
+    """
+    Enabled modules of every client as an int bitset, one bit per module of
+    the catalog (bit i = i-th catalog key). `is_enabled` is a dict lookup and
+    a bit test; the index is rebuilt only when the modules collection or the
+    catalog changes. Keys that left the catalog are simply not represented.
+    """
+
+    def __init__(self, store=storage):
+        self.store = store
+        self._lock = threading.Lock()
+        self._signature = None
+        self._keys: List[str] = []
+        self._bits: Dict[str, int] = {}
+        self._masks: Dict[str, int] = {}
+
+    def _refresh(self):
+        signature = (self.store.modules.version(), available_modules_version())
+        if signature == self._signature:
+            return
+        with self._lock:
+            signature = (self.store.modules.version(), available_modules_version())
+            if signature == self._signature:
+                return
+            keys = [m["key"] for m in list_available_modules()]
+            bits = {k: 1 << i for i, k in enumerate(keys)}
+            masks = {}
+            for cfg in self.store.modules.all():
+                masks[cfg["id"]] = self._mask(cfg.get("enabled", []), bits)
+            self._keys, self._bits, self._masks = keys, bits, masks
+            self._signature = signature
+
+    @staticmethod
+    def _mask(keys: Iterable[str], bits: Dict[str, int]) -> int:
+        mask = 0
+        for k in keys:
+            mask |= bits.get(k, 0)
+        return mask
+
+    def mask(self, keys: Iterable[str]) -> int:
+        self._refresh()
+        return self._mask(keys, self._bits)
+
+    def client_mask(self, client_id: str) -> Optional[int]:
+        """Bitset of a client (None if it has no modules record); no refresh."""
+        return self._masks.get(client_id)
+
+    def keys_of(self, mask: int) -> List[str]:
+        return [k for i, k in enumerate(self._keys) if mask >> i & 1]
+
+    def is_enabled(self, client_id: str, module_key: str) -> bool:
+        self._refresh()
+        return bool(self._masks.get(client_id, 0) & self._bits.get(module_key, 0))
+
+    def enabled(self, client_id: str) -> List[str]:
+        self._refresh()
+        return self.keys_of(self._masks.get(client_id, 0))
+
+    def adoption(self) -> Dict[str, int]:
+        self._refresh()
+        return {k: sum(1 for m in self._masks.values() if m >> i & 1) for i, k in enumerate(self._keys)}
+
+entitlements = EntitlementIndex()
+
+def is_module_enabled(client_id: str, module_key: str) -> bool:
+    return entitlements.is_enabled(client_id, module_key)
 
 def get_client_modules(client_id: str):
-    data = _read_file()
-    return data.get("client_modules", {}).get(client_id, {"enabled": []})
+    return {"enabled": entitlements.enabled(client_id)}
 
 def set_client_modules(client_id: str, enabled_keys: list):
-    data = _read_file()
-    available = {m["key"] for m in data.get("available", [])}
+    available = {m["key"] for m in list_available_modules()}
     enabled = [k for k in enabled_keys if k in available]
-    if "client_modules" not in data:
-        data["client_modules"] = {}
-    data["client_modules"][client_id] = {"enabled": enabled}
-    _write_file(data)
-    return data["client_modules"][client_id]
+    storage.modules.upsert({"id": client_id, "enabled": enabled})
+    return {"enabled": enabled}
+
+def update_modules_batch(client_ids: Optional[List[str]], enable: List[str] = (), disable: List[str] = ()) -> Dict[str, List[str]]:
+    """
+    Enable/disable modules for many clients (all clients when `client_ids`
+    is None) in a single transaction: one write, one version bump.
+    Returns the new enabled list per client.
+    """
+    with storage.transaction():
+        # under the write lock: nobody else can change modules until we commit
+        on, off = entitlements.mask(enable), entitlements.mask(disable)
+        ids = storage.clients.ids() if client_ids is None else list(dict.fromkeys(client_ids))
+        result, changed = {}, []
+        for cid in ids:
+            before = entitlements.client_mask(cid)
+            after = ((before or 0) | on) & ~off
+            result[cid] = entitlements.keys_of(after)
+            if after != before:
+                changed.append({"id": cid, "enabled": result[cid]})
+        if changed:
+            storage.modules.upsert_many(changed)
+    return result
 
 def enable_module_for_client(client_id: str, module_key: str):
-    cfg = get_client_modules(client_id)
-    if module_key not in cfg["enabled"]:
-        cfg["enabled"].append(module_key)
-    return set_client_modules(client_id, cfg["enabled"])
+    return {"enabled": update_modules_batch([client_id], enable=[module_key])[client_id]}
 
 def disable_module_for_client(client_id: str, module_key: str):
-    cfg = get_client_modules(client_id)
-    if module_key in cfg["enabled"]:
-        cfg["enabled"].remove(module_key)
-    return set_client_modules(client_id, cfg["enabled"])
+    return {"enabled": update_modules_batch([client_id], disable=[module_key])[client_id]}
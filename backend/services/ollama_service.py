@@ -0,0 +1,147 @@
+# backend/services/ollama_service.py
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from backend.core.fair_scheduler import FairScheduler
+
+# carregar .env
+ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
+load_dotenv(dotenv_path=ENV_PATH)
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/chat")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen2.5")
+OLLAMA_FIRST_BYTE_TIMEOUT = float(os.getenv("OLLAMA_FIRST_BYTE_TIMEOUT", "8"))
+OLLAMA_TOTAL_TIMEOUT = float(os.getenv("OLLAMA_TOTAL_TIMEOUT", "60"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+
+# scheduler in front of the model: LLM_TENANT_WEIGHTS="site-a.com=2,site-b.com=1"
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "4"))
+LLM_MAX_QUEUE_PER_TENANT = int(os.getenv("LLM_MAX_QUEUE_PER_TENANT", "10"))
+LLM_MAX_QUEUE_TOTAL = int(os.getenv("LLM_MAX_QUEUE_TOTAL", "100"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+LLM_TENANT_WEIGHTS = os.getenv("LLM_TENANT_WEIGHTS", "")
+
+class OllamaError(Exception):
+    pass
+
+class OllamaTimeout(OllamaError):
+    pass
+
+class OllamaClient:
+    """
+    Async client for Ollama's /api/chat with a pooled keep-alive connection.
+
+    Replies are always requested with stream=true and read as NDJSON, which
+    lets us enforce two deadlines: `first_byte_timeout` until the first token
+    arrives and `total_timeout` for the whole reply.
+    """
+
+    def __init__(
+        self,
+        url: str = OLLAMA_URL,
+        model: str = OLLAMA_MODEL,
+        first_byte_timeout: float = OLLAMA_FIRST_BYTE_TIMEOUT,
+        total_timeout: float = OLLAMA_TOTAL_TIMEOUT,
+        max_connections: int = OLLAMA_MAX_CONNECTIONS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = url
+        self.model = model
+        self.first_byte_timeout = first_byte_timeout
+        self.total_timeout = total_timeout
+        self.max_connections = max_connections
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                # per-read deadlines are enforced in stream_chat
+                timeout=httpx.Timeout(self.total_timeout, connect=min(5.0, self.first_byte_timeout)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def stream_chat(self, messages: List[Dict], model: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield content chunks as Ollama produces them."""
+        started = time.monotonic()
+        first_byte_deadline = started + self.first_byte_timeout
+        total_deadline = started + self.total_timeout
+        got_first = False
+        payload = {"model": model or self.model, "messages": messages, "stream": True}
+
+        try:
+            async with self._get_client().stream("POST", self.url, json=payload) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise OllamaError(f"Ollama respondeu {response.status_code}: {response.text[:200]}")
+                lines = response.aiter_lines()
+                while True:
+                    deadline = total_deadline if got_first else min(first_byte_deadline, total_deadline)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise OllamaTimeout("primeiro token" if not got_first else "tempo total excedido")
+                    try:
+                        line = await asyncio.wait_for(lines.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        raise OllamaTimeout("primeiro token" if not got_first else "tempo total excedido")
+                    if not line.strip():
+                        continue
+                    try:
+                        chunk = json.loads(line)
+                    except ValueError:
+                        raise OllamaError(f"linha NDJSON inválida: {line[:200]}")
+                    if chunk.get("error"):
+                        raise OllamaError(chunk["error"])
+                    content = (chunk.get("message") or {}).get("content", "")
+                    if content:
+                        got_first = True
+                        yield content
+                    if chunk.get("done"):
+                        return
+        except httpx.TimeoutException as e:
+            raise OllamaTimeout(str(e) or "timeout") from e
+        except httpx.HTTPError as e:
+            raise OllamaError(str(e)) from e
+
+    async def chat(self, messages: List[Dict], model: Optional[str] = None) -> str:
+        parts = [chunk async for chunk in self.stream_chat(messages, model=model)]
+        return "".join(parts)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+def _parse_weights(raw: str) -> Dict[str, float]:
+    weights = {}
+    for item in raw.split(","):
+        if "=" in item:
+            tenant, weight = item.split("=", 1)
+            try:
+                weights[tenant.strip()] = float(weight)
+            except ValueError:
+                continue
+    return weights
+
+ollama_client = OllamaClient()
+
+llm_scheduler = FairScheduler(
+    max_inflight=LLM_MAX_INFLIGHT,
+    max_queue_per_tenant=LLM_MAX_QUEUE_PER_TENANT,
+    max_queue_total=LLM_MAX_QUEUE_TOTAL,
+    weights=_parse_weights(LLM_TENANT_WEIGHTS),
+    queue_timeout=LLM_QUEUE_TIMEOUT,
+)
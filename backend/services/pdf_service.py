@@ -0,0 +1,206 @@
+# backend/services/pdf_service.py
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+try:
+    # optional: only needed to merge a batch into a single PDF
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR") or DATA_DIR / "pdf_cache")
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# bump when the layout below changes so cached files are rendered again
+PDF_TEMPLATE_VERSION = "1"
+# fields that end up on the page; nothing else changes the rendered bytes
+PDF_FIELDS = ("nome", "email", "whatsapp", "empresa", "segmento", "volume", "canal", "objetivo", "descricao")
+
+def generate_pdf(data: dict) -> bytes:
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    x, y = 40, 800
+
+    def section(title):
+        nonlocal y
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(x, y, title)
+        y -= 20
+        c.setLineWidth(1)
+        c.line(x, y, x + 500, y)
+        y -= 20
+
+    def line(label, value):
+        nonlocal y
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(x, y, f"{label}:")
+        c.setFont("Helvetica", 10)
+        c.drawString(x + 140, y, str(value or "-"))
+        y -= 18
+
+    def block(label, text):
+        nonlocal y
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(x, y, f"{label}:")
+        y -= 16
+        c.setFont("Helvetica", 10)
+        if not text: text = "-"
+        paragraphs = [text[i:i+90] for i in range(0, len(text), 90)]
+        for p in paragraphs:
+            c.drawString(x + 10, y, p)
+            y -= 14
+        y -= 10
+
+    section("Informações Básicas")
+    line("Nome", data.get("nome"))
+    line("Email", data.get("email"))
+    line("WhatsApp", data.get("whatsapp"))
+    line("Empresa", data.get("empresa"))
+
+    section("Diagnóstico")
+    line("Segmento", data.get("segmento"))
+    line("Volume diário", data.get("volume"))
+    line("Canais", ", ".join(data.get("canal", [])))
+    line("Objetivos", ", ".join(data.get("objetivo", [])))
+
+    section("Descrição Geral")
+    block("Resumo do negócio", data.get("descricao", "Não informado"))
+
+    c.setFont("Helvetica-Oblique", 9)
+    c.drawString(40, 40, "Gerado automaticamente pelo GhostAI 👻")
+    c.save()
+    return buffer.getvalue()
+
+# ---------------- CACHE EM DISCO ----------------
+
+def pdf_digest(data: Dict) -> str:
+    """Content hash of what the PDF shows; doubles as the cache key and the ETag."""
+    content = {"v": PDF_TEMPLATE_VERSION, **{f: data.get(f) for f in PDF_FIELDS}}
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+def cache_path(digest: str, cache_dir: Path = PDF_CACHE_DIR) -> Path:
+    return cache_dir / digest[:2] / f"{digest}.pdf"
+
+def render_to_cache(data: Dict, cache_dir: Path = PDF_CACHE_DIR) -> Tuple[str, Path]:
+    """Render `data` unless an identical PDF is already cached. Safe to run in a worker process."""
+    digest = pdf_digest(data)
+    path = cache_path(digest, cache_dir)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(generate_pdf(data))
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+    return digest, path
+
+def lead_pdf_bytes(data: Dict) -> bytes:
+    return render_to_cache(data)[1].read_bytes()
+
+# ---------------- LOTE ----------------
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pool
+
+def shutdown_pdf_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def render_batch(leads: Iterable[Dict]) -> Iterator[Tuple[Dict, Path]]:
+    """
+    (lead, cached pdf path) in input order. Cache hits are answered right
+    away; misses are rendered in the process pool so a big export uses every
+    core instead of pinning the request's worker.
+    """
+    leads = list(leads)
+    paths: List[Optional[Path]] = []
+    misses = []
+    for i, lead in enumerate(leads):
+        path = cache_path(pdf_digest(lead))
+        paths.append(path if path.exists() else None)
+        if paths[-1] is None:
+            misses.append(i)
+    futures = {i: _get_pool().submit(render_to_cache, leads[i]) for i in misses}
+    try:
+        for i, lead in enumerate(leads):
+            yield lead, paths[i] or futures[i].result()[1]
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+def _entry_name(lead: Dict, used: set) -> str:
+    base = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in (lead.get("empresa") or lead.get("nome") or "lead"))[:40]
+    name = f"{base}_{(lead.get('id') or '')[:8]}.pdf"
+    while name in used:
+        name = f"_{name}"
+    used.add(name)
+    return name
+
+class _ChunkBuffer:
+    """Write-only file object for ZipFile; whatever was written is drained between entries."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_zip(leads: Iterable[Dict]) -> Iterator[bytes]:
+    """ZIP with one PDF per lead, yielded entry by entry (PDFs are already compressed: stored)."""
+    buffer = _ChunkBuffer()
+    used: set = set()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+        for lead, path in render_batch(leads):
+            zf.write(path, arcname=_entry_name(lead, used))
+            yield buffer.drain()
+    yield buffer.drain()
+
+def merged_pdf(leads: Iterable[Dict]) -> Iterator[bytes]:
+    """All leads in a single PDF (needs pypdf). Built in a spooled file, then streamed."""
+    if PdfWriter is None:
+        raise RuntimeError("pypdf não instalado: use o formato zip")
+    writer = PdfWriter()
+    for _, path in render_batch(leads):
+        writer.append(str(path))
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as out:
+        writer.write(out)
+        writer.close()
+        out.seek(0)
+        while True:
+            chunk = out.read(64 * 1024)
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,98 @@
+# backend/services/theme_service.py
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Hashable, Optional
+from backend.core.lru_cache import LRUCache
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+THEME_CSS_DIR = DATA_DIR / "theme_css"
+THEME_CSS_URL = "/theme-css"  # where main.py mounts THEME_CSS_DIR
+
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "1000"))
+DASHBOARD_CACHE_MAX_BYTES = int(os.getenv("DASHBOARD_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# tema keys (pt/en) -> the CSS variables dashboard.css is built on
+THEME_VARS = {
+    "accent": "--accent", "primary": "--accent", "cor_primaria": "--accent",
+    "bg": "--bg", "background": "--bg", "cor_fundo": "--bg",
+    "surface": "--surface", "card": "--card",
+    "text": "--text", "cor_texto": "--text",
+    "muted": "--muted",
+}
+_VAR_NAME = re.compile(r"^[a-z][a-z0-9-]{0,40}$")
+# colors, lengths, rgb()/hsl(), font names; nothing that can close the rule
+_VAR_VALUE = re.compile(r"^[#(),.%\w\s'\"-]{1,80}$")
+
+# ---------------- CSS DO TEMA ----------------
+
+def compile_theme_css(tema: Optional[Dict]) -> str:
+    """`:root` overrides for a client's tema; extra variables go in tema["vars"]. Empty when nothing applies."""
+    tema = tema or {}
+    declarations = {}
+    for key, var in THEME_VARS.items():
+        value = tema.get(key)
+        if isinstance(value, str) and _VAR_VALUE.match(value):
+            declarations[var] = value.strip()
+    for name, value in (tema.get("vars") or {}).items():
+        if isinstance(value, str) and _VAR_NAME.match(str(name)) and _VAR_VALUE.match(value):
+            declarations[f"--{name}"] = value.strip()
+    if not declarations:
+        return ""
+    body = "".join(f"{var}:{value};" for var, value in sorted(declarations.items()))
+    return f":root{{{body}}}\n"
+
+def theme_css_url(tema: Optional[Dict]) -> Optional[str]:
+    """
+    Write the compiled CSS as <sha256>.css (once per distinct theme) and
+    return its URL; None when the tema changes nothing.
+    """
+    css = compile_theme_css(tema)
+    if not css:
+        return None
+    name = f"{hashlib.sha256(css.encode('utf-8')).hexdigest()[:20]}.css"
+    path = THEME_CSS_DIR / name
+    if not path.exists():
+        THEME_CSS_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=THEME_CSS_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(css)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+    return f"{THEME_CSS_URL}/{name}"
+
+# ---------------- CACHE DO DASHBOARD ----------------
+
+class DashboardCache:
+    """
+    Rendered dashboard HTML per client. Each entry carries the signature it
+    was rendered for (client version, template mtime, asset manifest), so a
+    theme change from another worker is noticed on the next hit; update_client
+    also drops the entry right away.
+    """
+
+    def __init__(self, max_entries: int = DASHBOARD_CACHE_MAX_ENTRIES, max_bytes: int = DASHBOARD_CACHE_MAX_BYTES):
+        # entries only go stale through their signature
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=float("inf"))
+
+    def get(self, client_id: str, signature: Hashable) -> Optional[str]:
+        entry = self._cache.get(client_id)
+        if entry is None or entry[0] != signature:
+            return None
+        return entry[1]
+
+    def set(self, client_id: str, signature: Hashable, html: str):
+        self._cache.set(client_id, (signature, html), size=len(html.encode("utf-8")) + 128)
+
+    def invalidate(self, client_id: str):
+        self._cache.pop(client_id)
+
+    def stats(self) -> Dict:
+        return self._cache.stats()
+
+dashboard_cache = DashboardCache()
@@ -0,0 +1,133 @@
+# backend/tools/build_assets.py
+"""
+Fingerprints the static frontend mounts and precompresses them.
+
+    python -m backend.tools.build_assets
+
+For every directory in core.assets.STATIC_MOUNTS, assets are copied to
+frontend/.build/<mount>/ as name.<hash>.ext (plus .gz / .br when that saves
+space) and listed in frontend/.build/manifest.json. HTML pages are copied to
+frontend/.build/pages/ with their src/href pointing at the hashed files.
+Brotli is optional (pip install brotli); without it only .gz is written.
+Run it again after changing any asset.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from backend.core.assets import BUILD_DIR, FRONTEND_DIR, STATIC_MOUNTS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FINGERPRINT_EXTENSIONS = {".css", ".js", ".svg", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".woff", ".woff2"}
+COMPRESS_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt"}
+MIN_COMPRESS_BYTES = 256
+# a variant is only kept if it is at least this much smaller
+MAX_COMPRESSED_RATIO = 0.9
+HASH_LENGTH = 10
+SKIP_DIRS = {".build", "user_uploads"}
+
+URL_ATTR_RE = re.compile(r'''((?:src|href)\s*=\s*["'])([^"']+)(["'])''')
+
+def _fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+def _hashed_name(path: Path, digest: str) -> str:
+    return f"{path.stem}.{digest}{path.suffix}"
+
+def _walk(root: Path):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for name in sorted(filenames):
+            yield Path(dirpath) / name
+
+def _compress(dest: Path, data: bytes) -> Dict[str, int]:
+    sizes = {}
+    if dest.suffix not in COMPRESS_EXTENSIONS or len(data) < MIN_COMPRESS_BYTES:
+        return sizes
+    # mtime=0 keeps the .gz byte-identical between builds
+    variants = [("gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(("br", brotli.compress(data, quality=11)))
+    for suffix, packed in variants:
+        if len(packed) <= len(data) * MAX_COMPRESSED_RATIO:
+            dest.with_name(f"{dest.name}.{suffix}").write_bytes(packed)
+            sizes[suffix] = len(packed)
+    return sizes
+
+def build_mount(prefix: str, source: Path, out: Path, manifest: Dict[str, str], stats: Dict[str, int]):
+    for path in _walk(source):
+        if path.suffix.lower() not in FINGERPRINT_EXTENSIONS:
+            continue
+        rel = path.relative_to(source)
+        data = path.read_bytes()
+        hashed = rel.with_name(_hashed_name(rel, _fingerprint(data)))
+        dest = out / hashed
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(data)
+        sizes = _compress(dest, data)
+        manifest[f"{prefix}/{rel.as_posix()}"] = f"{prefix}/{hashed.as_posix()}"
+        stats["files"] += 1
+        stats["bytes"] += len(data)
+        stats["compressed"] += min(sizes.values(), default=len(data))
+
+def rewrite_html(html: str, manifest: Dict[str, str]) -> str:
+    def replace(match):
+        url = match.group(2)
+        path, sep, rest = url.partition("?")
+        return match.group(1) + manifest.get(path, path) + sep + rest + match.group(3)
+    return URL_ATTR_RE.sub(replace, html)
+
+def build_pages(out: Path, manifest: Dict[str, str]) -> int:
+    count = 0
+    for path in _walk(FRONTEND_DIR):
+        if path.suffix.lower() != ".html":
+            continue
+        dest = out / path.relative_to(FRONTEND_DIR)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_text(rewrite_html(path.read_text("utf-8"), manifest), "utf-8")
+        count += 1
+    return count
+
+def build(build_dir: Path = BUILD_DIR) -> Dict:
+    """Build into a fresh directory and swap it in, so a running server never sees half a build."""
+    build_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".build-", dir=build_dir.parent))
+    manifest: Dict[str, str] = {}
+    stats = {"files": 0, "bytes": 0, "compressed": 0}
+    try:
+        for prefix, rel in STATIC_MOUNTS.items():
+            build_mount(prefix, FRONTEND_DIR / rel, staging / prefix.strip("/"), manifest, stats)
+        stats["pages"] = build_pages(staging / "pages", manifest)
+        (staging / "manifest.json").write_text(
+            json.dumps({"assets": manifest}, indent=2, ensure_ascii=False, sort_keys=True), "utf-8"
+        )
+        previous = None
+        if build_dir.exists():
+            previous = build_dir.with_name(build_dir.name + ".old")
+            shutil.rmtree(previous, ignore_errors=True)
+            os.replace(build_dir, previous)
+        os.replace(staging, build_dir)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return stats
+
+if __name__ == "__main__":
+    result = build()
+    saved = result["bytes"] - result["compressed"]
+    print(
+        f"{result['files']} assets, {result['pages']} páginas -> {BUILD_DIR} "
+        f"({result['bytes']} bytes, {saved} economizados com compressão; brotli {'ok' if brotli else 'ausente'})"
+    )
@@ -0,0 +1,49 @@
+# backend/tools/ollama_stub.py
+"""
+Minimal stand-in for Ollama's /api/chat, for local testing without a GPU.
+
+    uvicorn backend.tools.ollama_stub:app --port 11435
+    OLLAMA_URL=http://localhost:11435/api/chat uvicorn backend.main:app
+
+It answers with NDJSON chunks like the real server. STUB_FIRST_DELAY and
+STUB_TOKEN_DELAY (seconds) emulate model latency, STUB_REPLY sets the text.
+"""
+import asyncio
+import json
+import os
+from datetime import datetime
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+STUB_FIRST_DELAY = float(os.getenv("STUB_FIRST_DELAY", "0.2"))
+STUB_TOKEN_DELAY = float(os.getenv("STUB_TOKEN_DELAY", "0.02"))
+STUB_REPLY = os.getenv("STUB_REPLY", "Olá! Eu sou o GhostAI de teste. Como posso ajudar?")
+
+app = FastAPI(title="Ollama stub")
+
+def _chunk(model: str, content: str, done: bool) -> str:
+    return json.dumps({
+        "model": model,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "message": {"role": "assistant", "content": content},
+        "done": done,
+    }) + "\n"
+
+@app.post("/api/chat")
+async def chat(req: Request):
+    body = await req.json()
+    model = body.get("model", "stub")
+    tokens = [w + " " for w in STUB_REPLY.split(" ")]
+
+    async def ndjson():
+        await asyncio.sleep(STUB_FIRST_DELAY)
+        for token in tokens:
+            yield _chunk(model, token, False)
+            await asyncio.sleep(STUB_TOKEN_DELAY)
+        yield _chunk(model, "", True)
+
+    if body.get("stream") is False:
+        await asyncio.sleep(STUB_FIRST_DELAY)
+        return json.loads(_chunk(model, "".join(tokens), True))
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
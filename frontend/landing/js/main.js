@@ -14,31 +14,32 @@ function go(path) {
 }
 
 const CHAT_STORAGE_KEY = "chatQuali";
-const CHAT_HISTORY_KEY = "chatHistory";
+const CHAT_CONVERSATION_KEY = "chatConversationId";
 
 function createEmptyChatState() {
   return { stage: 0, data: {} };
 }
 let chatState = loadChatState();
-let chatHistory = loadChatHistory();
+let chatConversationId = sessionStorage.getItem(CHAT_CONVERSATION_KEY);
 
 function loadChatState() {
   try { return JSON.parse(sessionStorage.getItem(CHAT_STORAGE_KEY)) || createEmptyChatState(); } catch { return createEmptyChatState(); }
 }
-function loadChatHistory() {
-  try { return JSON.parse(sessionStorage.getItem(CHAT_HISTORY_KEY)) || []; } catch { return []; }
-}
 function saveChatState() { sessionStorage.setItem(CHAT_STORAGE_KEY, JSON.stringify(chatState)); }
-function saveChatHistory() { sessionStorage.setItem(CHAT_HISTORY_KEY, JSON.stringify(chatHistory)); }
+function saveConversationId(id) {
+  if (!id) return;
+  chatConversationId = id;
+  sessionStorage.setItem(CHAT_CONVERSATION_KEY, id);
+}
 
 document.addEventListener("DOMContentLoaded", () => {
   if (window.location.pathname === "/success") {
     sessionStorage.removeItem("onboardingData");
     sessionStorage.removeItem("checkout");
     sessionStorage.removeItem(CHAT_STORAGE_KEY);
-    sessionStorage.removeItem(CHAT_HISTORY_KEY);
+    sessionStorage.removeItem(CHAT_CONVERSATION_KEY);
     chatState = createEmptyChatState();
-    chatHistory = [];
+    chatConversationId = null;
   }
 
   const checkoutForm = document.getElementById("checkout-form");
@@ -211,6 +212,47 @@ function waitingResponses(stage) {
   }[stage];
 }
 
+/* IA chat: tokens chegam via server-sent events (/api/chat/stream) */
+async function streamChat(body) {
+  const res = await fetch("/api/chat/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok || !res.body) throw new Error("chat stream failed");
+
+  const msg = document.createElement("div");
+  msg.classList.add("chat-msg");
+  chatLog?.appendChild(msg);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let reply = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const event = (raw.match(/^event: (.*)$/m) || [])[1];
+      const data = JSON.parse((raw.match(/^data: (.*)$/m) || [])[1] || "{}");
+      saveConversationId(data.conversation_id);
+      if (event === "token") {
+        reply += data.content;
+        msg.textContent = reply;
+        chatLog?.scrollTo({ top: chatLog.scrollHeight });
+      } else if (event === "error") {
+        msg.textContent = data.reply;
+        return "";
+      }
+    }
+  }
+  return reply;
+}
+
 /* IA chat submit */
 chatForm?.addEventListener("submit", async (e) => {
   e.preventDefault();
@@ -218,16 +260,13 @@ chatForm?.addEventListener("submit", async (e) => {
   if (!message) return;
   addMessage(message, "user");
   chatInput.value = "";
-  chatHistory.push({ role: "user", content: message });
-  saveChatHistory();
   if (chatState.stage < 7) return handleChatFlow(message);
   try {
-    const ai = await post("/api/chat", { message, history: chatHistory });
-    if (ai.reply) {
-      addMessage(ai.reply, "bot");
-      chatHistory.push({ role: "assistant", content: ai.reply });
-      saveChatHistory();
-    }
+    // o histórico fica no servidor: mandamos só a mensagem nova + id da conversa
+    const body = { message, conversation_id: chatConversationId };
+    // primeira pergunta livre: as respostas da qualificação iniciam a conversa no servidor
+    if (!chatConversationId) body.history = Object.values(chatState.data).map(content => ({ role: "user", content }));
+    await streamChat(body);
     if (/(fechar|contratar|link|checkout|começar|ativar|onde pago|assinar|pagar)/i.test(message)) {
       await botTypingEffect("Show! 🤝 Para continuar use o botão Iniciar diagnóstico ou acesse /checkout no site.");
     }